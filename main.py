@@ -5,11 +5,16 @@ import re
 from jsonschema import ValidationError
 
 from src.character_parser import CharacterParser, CharacterConfig
+from src.character_config_store import CharacterConfigStore
 from src.search import CharacterSearcher
 from src.tier import TierClassifier
 from src.tier_parser import TierParser
-from src.character_io import write_to_csv, read_from_csv
+from src.tier_remap import remap_character_tiers
+from src.character_io import write_to_csv, read_from_csv, write_characters_binary, read_characters_binary, \
+    BINARY_FILE_EXTENSION
 from src.battle import versus_battle
+from src.roster_index import RosterIndex
+from src.matchup_query import versions_beating
 from src.config_validation import validate_tier_schema, validate_character_schema
 from src import *
 
@@ -39,13 +44,13 @@ def prompt_tier_config() -> (TierClassifier, TierParser):
             return t_classifier, t_parser
     except FileNotFoundError as file_error:
         logging.error(f"File not found: {str(file_error)}.")
-        prompt_tier_config()
+        return prompt_tier_config()
     except ValidationError as validation_error:
         logging.error(f"The given config file is not valid. {str(validation_error)}")
-        prompt_tier_config()
+        return prompt_tier_config()
 
 
-def prompt_char_config(tier_parser: TierParser) -> (CharacterParser, str):
+def prompt_char_config(tier_parser: TierParser) -> (CharacterParser, CharacterConfigStore):
     char_config_fpath = input("Please provide the path to character configuration file (Press enter to use default): ")
     if char_config_fpath.strip() == "":
         char_config_fpath = DEFAULT_CHARACTER_CONFIG_PATH
@@ -53,15 +58,16 @@ def prompt_char_config(tier_parser: TierParser) -> (CharacterParser, str):
         with open(char_config_fpath, 'r') as config_file:
             char_config_json = json.load(config_file)
             validate_character_schema(char_config_json)
-            res = CharacterParser(tier_parser, char_config_json)
+            config_store = CharacterConfigStore(char_config_fpath, char_config_json)
+            res = CharacterParser(tier_parser, config_store)
             print("Character configuration successful!\n")
-            return res, char_config_fpath
+            return res, config_store
     except FileNotFoundError as file_error:
         logging.error(f"File not found: {str(file_error)}.")
-        prompt_char_config(tier_parser)
+        return prompt_char_config(tier_parser)
     except ValidationError as validation_error:
         logging.error(f"The given config file is not valid. {str(validation_error)}")
-        prompt_char_config(tier_parser)
+        return prompt_char_config(tier_parser)
 
 
 def prompt_main_menu() -> int:
@@ -73,12 +79,15 @@ def prompt_main_menu() -> int:
     print("5. Parse a character")
     print("6. Display a parsed character")
     print("7. Combine two versions of a parsed character into one")
-    print("8. Write parsed character stat(s) to csv file(s) (',' indicates union; '-' indicates inclusive range)")
-    print("9. Read character(s) from csv file(s)")
+    print("8. Write parsed character stat(s) to csv or binary file(s) "
+          "(',' indicates union; '-' indicates inclusive range)")
+    print("9. Read character(s) from csv or binary file(s)")
     print("10. VS battle between two parsed characters")
     print("11. Search and add a new character")
     print("12. Write the character data to the config file")
-    print("13. Quit the application\n")
+    print("13. Reload the tier configuration")
+    print("14. Find the versions that beat a character version on at least a number of stats")
+    print("15. Quit the application\n")
     print("Please pick an option by its number:", end=" ")
     return prompt_menu_selection()
 
@@ -87,7 +96,7 @@ def prompt_menu_selection() -> int:
     choice_string = input()
     if choice_string.isdigit():
         choice_num = int(choice_string)
-        if 0 < choice_num < 14:
+        if 0 < choice_num < 16:
             return choice_num
     print("Please pick a valid number:", end=" ")
     return prompt_menu_selection()
@@ -96,11 +105,12 @@ def prompt_menu_selection() -> int:
 class Main:
     def __init__(self):
         self.tier_classifier, self.tier_parser = prompt_tier_config()
-        self.character_parser, self.char_config_fpath = prompt_char_config(self.tier_parser)
-        # self.configured_characters: List[CharacterConfig]
-        self.configured_characters = self.character_parser.character_configs
+        # self.character_config_store: CharacterConfigStore, shared with self.character_parser
+        self.character_parser, self.character_config_store = prompt_char_config(self.tier_parser)
         # self.parsed_characters: List[FictionalCharacter]
         self.parsed_characters = []
+        # self.roster_index: RosterIndex, kept up to date with self.parsed_characters
+        self.roster_index = RosterIndex(self.tier_classifier.get_all_stat_names())
 
         self.main()
 
@@ -122,11 +132,11 @@ class Main:
                 tiers = self.tier_classifier.get_all_tiers_of_stat(stat_name)
                 print('\n'.join([str(tier) for tier in tiers]))
             case 3:
-                if len(self.configured_characters) == 0:
+                if len(self.character_config_store) == 0:
                     print("No configured characters found!")
                 else:
-                    for index, configured_char in enumerate(self.configured_characters):
-                        print(f"#{index + 1}: {configured_char.character_name}")
+                    for index, configured_char_name in enumerate(self.character_config_store.get_character_names()):
+                        print(f"#{index + 1}: {configured_char_name}")
             case 4:
                 if len(self.parsed_characters) == 0:
                     print("No parsed characters found!")
@@ -137,11 +147,12 @@ class Main:
                 character_name = input("Please enter the character's name: ")
                 if character_name in [parsed_char.character_name for parsed_char in self.parsed_characters]:
                     print("The character is already parsed!")
-                elif character_name not in [conf_char.character_name for conf_char in self.configured_characters]:
+                elif character_name not in self.character_config_store:
                     print("The character is not configured!")
                 else:
                     parsed_char = self.character_parser.parse_character(character_name)
                     self.parsed_characters.append(parsed_char)
+                    self.roster_index.add_character(parsed_char)
                     print("Character parsing successful!\n\n")
             case 6:
                 character_name = input("Please enter the character's name: ")
@@ -163,7 +174,10 @@ class Main:
                     else:
                         self.parsed_characters.remove(parsed_char1)
                         self.parsed_characters.remove(parsed_char2)
-                        self.parsed_characters.append(parsed_char1.add_versions_from_character(parsed_char2))
+                        duplicate_versions = parsed_char1.add_versions_from_character(parsed_char2)
+                        self.parsed_characters.append(parsed_char1)
+                        for duplicate_version in duplicate_versions:
+                            self.roster_index.remove_version(duplicate_version)
             case 8:
                 try:
                     input_indices = input("Please enter the numbers of the character you want to select: ")
@@ -178,33 +192,56 @@ class Main:
                                 split_range = num_or_range.split('-')
                                 range_begin = int(split_range[0]) - 1
                                 range_end = int(split_range[1]) - 1
-                                if 0 < range_begin < range_end < len(self.parsed_characters):
+                                if 0 <= range_begin <= range_end < len(self.parsed_characters):
                                     for i in range(range_begin, range_end + 1):
                                         chosen_characters.append(self.parsed_characters[i])
                                 else:
                                     print(f"Range input out of bounds: {num_or_range}")
                             else:
                                 char_index = int(num_or_range) - 1
-                                if 0 < char_index < len(self.parsed_characters):
+                                if 0 <= char_index < len(self.parsed_characters):
                                     chosen_characters.append(self.parsed_characters[char_index])
                                 else:
                                     print(f"Number input out of bounds: {num_or_range}")
-                    for character in chosen_characters:
-                        write_to_csv(character)
+                    binary_fpath = input("Please provide the path of a binary file to write all the characters into "
+                                         "(Press enter to write a csv file per character): ")
+                    if binary_fpath.strip() == "":
+                        for character in chosen_characters:
+                            write_to_csv(character)
+                    else:
+                        if not binary_fpath.endswith(BINARY_FILE_EXTENSION):
+                            binary_fpath += BINARY_FILE_EXTENSION
+                        compress = input("Would you like to compress the file? (y/n): ").strip().lower() == 'y'
+                        write_characters_binary(chosen_characters, binary_fpath, compress)
+                        print(f"{len(chosen_characters)} character(s) were written to \"{binary_fpath}\"!")
                 except IOError:
                     print("Error while writing characters to the file.")
             case 9:
-                fpath = input("Please provide the path to a csv file or a directory containing csv files: ")
-                if os.path.isfile(fpath):
+                fpath = input("Please provide the path to a csv or binary file or a directory containing such files: ")
+                if os.path.isfile(fpath) and fpath.endswith(BINARY_FILE_EXTENSION):
+                    parsed_chars = read_characters_binary(fpath, self.tier_classifier)
+                    self.parsed_characters.extend(parsed_chars)
+                    for parsed_char in parsed_chars:
+                        self.roster_index.add_character(parsed_char)
+                    print(f"{len(parsed_chars)} character(s) were read from the binary file successfully!")
+                elif os.path.isfile(fpath):
                     parsed_char = read_from_csv(fpath, self.tier_classifier)
                     self.parsed_characters.append(parsed_char)
+                    self.roster_index.add_character(parsed_char)
                     print(f"Character \"{parsed_char.character_name}\" was read from csv successfully!")
                 elif os.path.isdir(fpath):
                     parsed_chars = []
-                    for csv_file in os.listdir(fpath):
-                        if os.path.isfile(csv_file) and re.search("^([a-z]|[A-Z]|[0-9])+\.csv$", csv_file):
-                            parsed_chars.append(read_from_csv(csv_file, self.tier_classifier))
+                    for file_name in os.listdir(fpath):
+                        file_path = os.path.join(fpath, file_name)
+                        if not os.path.isfile(file_path):
+                            continue
+                        if file_name.endswith(".csv"):
+                            parsed_chars.append(read_from_csv(file_path, self.tier_classifier))
+                        elif file_name.endswith(BINARY_FILE_EXTENSION):
+                            parsed_chars.extend(read_characters_binary(file_path, self.tier_classifier))
                     self.parsed_characters.extend(parsed_chars)
+                    for parsed_char in parsed_chars:
+                        self.roster_index.add_character(parsed_char)
                 else:
                     print("The given path is invalid!")
             case 10:
@@ -215,10 +252,10 @@ class Main:
                 else:
                     print(parsed_char1)
                     v_name1 = input("\nPlease enter a version name: ")
-                    if v_name1 not in [version.version_name for version in parsed_char1.character_versions]:
+                    version_1 = parsed_char1.find_character_version(v_name1)
+                    if not version_1:
                         print("Version not found!")
                     else:
-                        version_1 = next(filter(lambda v: v.version_name == v_name1, parsed_char1.character_versions))
                         character_name2 = input("Please enter the second character's name: ")
                         parsed_char2 = self.find_parsed_character(character_name2)
                         if not parsed_char2:
@@ -226,11 +263,10 @@ class Main:
                         else:
                             print(parsed_char2)
                             v_name2 = input("\nPlease enter a version name: ")
-                            if v_name1 not in [version.version_name for version in parsed_char2.character_versions]:
+                            version_2 = parsed_char2.find_character_version(v_name2)
+                            if not version_2:
                                 print("Version not found!")
                             else:
-                                version_2 = next(
-                                    filter(lambda v: v.version_name == v_name2, parsed_char2.character_versions))
                                 print(versus_battle(version_1, version_2))
             case 11:
                 char_name = input("Please enter the name of character: ")
@@ -248,7 +284,8 @@ class Main:
                             char_num = int(input("Please enter the character's number: "))
                             if 0 < char_num <= len(searcher.results):
                                 search_result = searcher.results[char_num - 1]
-                                self.configured_characters.append(
+                                # The character is appended to the journal of the config right away.
+                                self.character_config_store.add_character(
                                     CharacterConfig(search_result.character_name, search_result.webpage_url))
                                 character_found = True
                         case 'P':
@@ -259,9 +296,44 @@ class Main:
                             page_num = int(input("Please enter the page number you would like to go to: "))
                             searcher.get_page_by_num(page_num)
             case 12:
-                with open(self.char_config_fpath, 'w') as outfile:
-                    json.dump(self.configured_characters, outfile)
+                try:
+                    self.character_config_store.compact()
+                    print("Character configuration was written successfully!")
+                except IOError:
+                    print("Error while writing the character configuration to the file.")
             case 13:
+                tier_classifier, tier_parser = prompt_tier_config()
+                remap_result = remap_character_tiers(self.parsed_characters, tier_classifier)
+                self.tier_classifier, self.tier_parser = tier_classifier, tier_parser
+                self.character_parser.tier_parser = tier_parser
+                # The tier values of the remapped characters changed, which can make versions identical and
+                # invalidates the index, so the versions are deduplicated and the index is built again.
+                for parsed_char in self.parsed_characters:
+                    parsed_char.deduplicate_versions()
+                self.roster_index = RosterIndex.from_characters(tier_classifier.get_all_stat_names(),
+                                                                self.parsed_characters)
+                print(remap_result)
+            case 14:
+                character_name = input("Please enter the character's name: ")
+                parsed_char = self.find_parsed_character(character_name)
+                if not parsed_char:
+                    print("Character not found!")
+                else:
+                    print(parsed_char)
+                    v_name = input("\nPlease enter a version name: ")
+                    version = parsed_char.find_character_version(v_name)
+                    min_stat_wins = input("Please enter the minimum number of stats to win: ")
+                    if not version:
+                        print("Version not found!")
+                    elif not min_stat_wins.isdigit():
+                        print("Please enter a valid number!")
+                    else:
+                        counters = versions_beating(self.roster_index, version, int(min_stat_wins))
+                        if len(counters) == 0:
+                            print("No versions found!")
+                        for counter in counters:
+                            print(f"{counter.character_name} {counter.version_name}")
+            case 15:
                 exit(0)
             case _:
                 print("Not implemented!")
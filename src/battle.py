@@ -42,7 +42,7 @@ def versus_battle(version1: FictionalCharacterVersion, version2: FictionalCharac
     stat_performance = {}
 
     for stat_name, tier1 in version1.stat_tier_map.items():
-        tier2 = version2.stat_tier_map[stat_name]
+        tier2 = version2.stat_tier_map.get(stat_name)
         if tier1 is None:
             logging.error(f"The stat {stat_name} is not associated with a tier value for first character.")
         elif tier2 is None:
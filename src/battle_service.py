@@ -0,0 +1,383 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+from collections import OrderedDict
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from . import DEFAULT_CHARACTER_CONFIG_PATH, DEFAULT_OUTPUT_DIR, DEFAULT_TIER_CONFIG_PATH
+from src.battle import VersusBattleScore, versus_battle
+from src.battle_standings import BattleResultsCache
+from src.character import FictionalCharacter, FictionalCharacterVersion
+from src.character_io import character_to_dict, read_from_csv
+from src.character_config_store import CharacterConfigStore
+from src.character_parser import CharacterParser
+from src.config_validation import validate_character_schema, validate_tier_schema
+from src.roster_index import RosterIndex
+from src.tier import TierClassifier
+from src.tier_parser import TierParser
+from typing import Any, Dict, List, Optional, Tuple
+
+# battle_key : (character name 1, version name 1, character name 2, version name 2)
+BattleKey = Tuple[str, str, str, str]
+
+
+class ServiceError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class BattleScoreCache:
+    # A least recently used cache of computed battle scores. Every entry is also registered under the names of both
+    # characters, so that all the scores of a character can be dropped when it is parsed again.
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        # self.scores: OrderedDict[BattleKey, VersusBattleScore], from the least to the most recently used
+        self.scores = OrderedDict()
+        # self.keys_by_character: Dict[str, Set[BattleKey]]
+        self.keys_by_character = {}
+
+    def get(self, key: BattleKey) -> Optional[VersusBattleScore]:
+        score = self.scores.get(key)
+        if score is not None:
+            self.scores.move_to_end(key)
+        return score
+
+    def put(self, key: BattleKey, score: VersusBattleScore):
+        self.scores[key] = score
+        self.scores.move_to_end(key)
+        self.keys_by_character.setdefault(key[0], set()).add(key)
+        self.keys_by_character.setdefault(key[2], set()).add(key)
+        while len(self.scores) > self.max_size:
+            evicted_key, _ = self.scores.popitem(last=False)
+            self._unregister(evicted_key)
+
+    def invalidate_character(self, character_name: str):
+        for key in self.keys_by_character.pop(character_name, set()):
+            if self.scores.pop(key, None) is not None:
+                self._unregister(key)
+
+    def _unregister(self, key: BattleKey):
+        for character_name in (key[0], key[2]):
+            keys = self.keys_by_character.get(character_name)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.keys_by_character[character_name]
+
+    def __len__(self):
+        return len(self.scores)
+
+
+def battle_score_to_dict(score: VersusBattleScore) -> Dict[str, Any]:
+    v1, v2 = score.character_version1, score.character_version2
+    if score.overall_winner < 0:
+        winner = {"character": v1.character_name, "version": v1.version_name}
+    elif score.overall_winner > 0:
+        winner = {"character": v2.character_name, "version": v2.version_name}
+    else:
+        winner = None
+    return {
+        "character1": v1.character_name,
+        "version1": v1.version_name,
+        "character2": v2.character_name,
+        "version2": v2.version_name,
+        "battleResults": score.battle_results,
+        "overallWinner": score.overall_winner,
+        "winner": winner
+    }
+
+
+class BattleService:
+    # Keeps the tier configuration, the parsed roster and its index in memory and answers battle queries from them.
+    # The methods of this class are synchronous; BattleServer exposes them over HTTP.
+    def __init__(self, tier_classifier: TierClassifier, character_parser: Optional[CharacterParser] = None,
+                 cache_size: int = 10000):
+        self.tier_classifier = tier_classifier
+        self.character_parser = character_parser
+        # self.roster: Dict[str, FictionalCharacter]
+        self.roster = {}
+        self.roster_index = RosterIndex(tier_classifier.get_all_stat_names())
+        self.score_cache = BattleScoreCache(cache_size)
+        # self._leaderboard: Optional[List[Dict[str, Any]]], computed on demand and dropped when the roster changes
+        self._leaderboard = None
+        # self._battle_results: Optional[BattleResultsCache], built on the first standings request and updated
+        # incrementally afterwards
+        self._battle_results = None
+
+    def set_character(self, character: FictionalCharacter):
+        # Adds the character to the roster, replacing any character with the same name along with its cached scores.
+        old_character = self.roster.get(character.character_name)
+        if old_character is not None:
+            self.roster_index.remove_character(old_character)
+        self.score_cache.invalidate_character(character.character_name)
+        self.roster[character.character_name] = character
+        self.roster_index.add_character(character)
+        self._leaderboard = None
+        if self._battle_results is not None:
+            self._battle_results.replace_character(old_character, character)
+
+    def parse_character(self, character_name: str) -> FictionalCharacter:
+        # Blocking, since the character is downloaded from its webpage. The result still has to be given to
+        # set_character, which BattleServer does on the event loop.
+        if self.character_parser is None:
+            raise ServiceError(503, "Character parsing is not configured.")
+        character = self.character_parser.parse_character(character_name)
+        if len(character.character_versions) == 0:
+            raise ServiceError(502, f"Character '{character_name}' could not be parsed.")
+        return character
+
+    def get_character(self, character_name: str) -> FictionalCharacter:
+        character = self.roster.get(character_name)
+        if character is None:
+            raise ServiceError(404, f"Character '{character_name}' not found.")
+        return character
+
+    def get_version(self, character_name: str, version_name: str) -> FictionalCharacterVersion:
+        version = self.get_character(character_name).find_character_version(version_name)
+        if version is None:
+            raise ServiceError(404, f"Version '{version_name}' of character '{character_name}' not found.")
+        return version
+
+    def battle(self, character_name1: str, version_name1: str, character_name2: str, version_name2: str) \
+            -> VersusBattleScore:
+        version1 = self.get_version(character_name1, version_name1)
+        version2 = self.get_version(character_name2, version_name2)
+        # Versions are cached by their canonical names, so that aliases share the same entry.
+        key = (character_name1, version1.version_name, character_name2, version2.version_name)
+        score = self.score_cache.get(key)
+        if score is None:
+            score = versus_battle(version1, version2)
+            self.score_cache.put(key, score)
+        return score
+
+    def batch_battle(self, matchups: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        results = []
+        for matchup in matchups:
+            if not isinstance(matchup, dict):
+                results.append({"error": "A matchup must be a JSON object."})
+                continue
+            try:
+                score = self.battle(matchup["character1"], matchup["version1"],
+                                    matchup["character2"], matchup["version2"])
+                results.append(battle_score_to_dict(score))
+            except KeyError as key_error:
+                results.append({"error": f"Missing matchup field {str(key_error)}."})
+            except ServiceError as service_error:
+                results.append({"error": service_error.message})
+        return results
+
+    def leaderboard(self, limit: int) -> List[Dict[str, Any]]:
+        # Versions are ranked by the number of (version, stat) pairs of the roster they beat, i.e. the number of stat
+        # comparisons they would win if they fought every version of the roster. The count of a stat is the size of
+        # the bitset of the versions below it, and versions sharing a stat vector share their counts. Like in
+        # versus_battle, a stat is only compared when both versions have a tier value, so the versions stored as 0
+        # are left out of the bitset, and a version without a tier value wins nothing in that stat.
+        if self._leaderboard is None:
+            entries = []
+            for vector, slots in self.roster_index.vector_bitsets.items():
+                stat_wins = sum((self.roster_index.at_most(stat_index, tier_value - 1)
+                                 & ~self.roster_index.at_most(stat_index, 0)).bit_count()
+                                for stat_index, tier_value in enumerate(vector) if tier_value > 0)
+                for version in self.roster_index.versions_of_bitset(slots):
+                    entries.append({"character": version.character_name, "version": version.version_name,
+                                    "statWins": stat_wins})
+            entries.sort(key=lambda entry: entry["statWins"], reverse=True)
+            self._leaderboard = entries
+        return self._leaderboard[:limit]
+
+    def standings(self, limit: int) -> List[Dict[str, Any]]:
+        # Versions are ranked by the battles they win against every other version of the roster.
+        if self._battle_results is None:
+            self._battle_results = BattleResultsCache()
+            for character in self.roster.values():
+                self._battle_results.add_character(character)
+        return [{"character": standing.version.character_name, "version": standing.version.version_name,
+                 "wins": standing.wins, "losses": standing.losses, "ties": standing.ties}
+                for standing in self._battle_results.leaderboard(limit)]
+
+
+class BattleServer:
+    # A small HTTP/1.1 server on asyncio streams. Requests are answered with JSON, and connections are kept alive
+    # unless the client asks otherwise, so many clients can be served concurrently by one process.
+    #
+    # GET  /characters                              names of the characters in the roster
+    # GET  /characters/{name}                       the versions and tiers of a character
+    # POST /characters/{name}/parse                 parses the character again and replaces it in the roster
+    # GET  /battle?character1=&version1=&character2=&version2=
+    # POST /battles                                 {"matchups": [{"character1": ..., "version1": ..., ...}, ...]}
+    # GET  /leaderboard?limit=10
+    # GET  /standings?limit=10
+    def __init__(self, battle_service: BattleService, host: str = "127.0.0.1", port: int = 8080):
+        self.battle_service = battle_service
+        self.host = host
+        self.port = port
+        self.server = None
+        self.max_body_size = 1024 * 1024
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port, backlog=1024)
+        # The port is read back, so that port 0 can be used to pick a free port.
+        self.port = self.server.sockets[0].getsockname()[1]
+        logging.info(f"Battle service is listening on http://{self.host}:{self.port}")
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            keep_alive = True
+            while keep_alive:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode("latin-1").strip().split(" ", 2)
+
+                headers = {}
+                while True:
+                    header_line = await reader.readline()
+                    if header_line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header_line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                body = b""
+                content_length_header = headers.get("content-length", "0")
+                # isdigit also accepts digits such as "²", which int does not parse.
+                content_length = int(content_length_header) \
+                    if content_length_header.isascii() and content_length_header.isdigit() else None
+                if content_length is None:
+                    # The body cannot be skipped without its length, so the connection is closed after the response.
+                    status, response = 400, {"error": "The Content-Length header is not valid."}
+                    keep_alive = False
+                elif content_length > self.max_body_size:
+                    status, response = 413, {"error": "Request body is too large."}
+                    keep_alive = False
+                else:
+                    if content_length > 0:
+                        body = await reader.readexactly(content_length)
+                    status, response = await self._dispatch(method, target, body)
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = connection != "close" and (version == "HTTP/1.1" or connection == "keep-alive")
+
+                await self._write_response(writer, status, response, keep_alive)
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            # Malformed requests and clients that went away simply close the connection.
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write_response(writer: asyncio.StreamWriter, status: int, response: Any, keep_alive: bool):
+        body = json.dumps(response).encode("utf-8")
+        reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                   413: "Payload Too Large", 500: "Internal Server Error", 502: "Bad Gateway",
+                   503: "Service Unavailable"}
+        head = f"HTTP/1.1 {status} {reasons.get(status, '')}\r\n" \
+               f"Content-Type: application/json\r\n" \
+               f"Content-Length: {len(body)}\r\n" \
+               f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    @staticmethod
+    def _parse_json_object(body: bytes) -> Dict[str, Any]:
+        try:
+            payload = json.loads(body or b"{}")
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise ServiceError(400, "The request body is not valid JSON.")
+        if not isinstance(payload, dict):
+            raise ServiceError(400, "The request body must be a JSON object.")
+        return payload
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, Any]:
+        split_target = urlsplit(target)
+        path = [unquote(part) for part in split_target.path.strip("/").split("/") if part]
+        query = {name: values[0] for name, values in parse_qs(split_target.query).items()}
+        service = self.battle_service
+        try:
+            match method, path:
+                case "GET", ["characters"]:
+                    return 200, sorted(service.roster)
+                case "GET", ["characters", character_name]:
+                    return 200, character_to_dict(service.get_character(character_name))
+                case "POST", ["characters", character_name, "parse"]:
+                    # Parsing downloads a webpage, so it runs in a thread instead of blocking the other requests.
+                    character = await asyncio.get_running_loop() \
+                        .run_in_executor(None, service.parse_character, character_name)
+                    service.set_character(character)
+                    return 200, character_to_dict(character)
+                case "GET", ["battle"]:
+                    score = service.battle(query.get("character1", ""), query.get("version1", ""),
+                                           query.get("character2", ""), query.get("version2", ""))
+                    return 200, battle_score_to_dict(score)
+                case "POST", ["battles"]:
+                    matchups = self._parse_json_object(body).get("matchups")
+                    if not isinstance(matchups, list):
+                        raise ServiceError(400, "The request body must contain a list of matchups.")
+                    return 200, service.batch_battle(matchups)
+                case "GET", ["leaderboard" | "standings" as board]:
+                    limit = query.get("limit", "10")
+                    if not limit.isdigit():
+                        raise ServiceError(400, "The limit must be a number.")
+                    if board == "leaderboard":
+                        return 200, service.leaderboard(int(limit))
+                    return 200, service.standings(int(limit))
+                case _, (["characters"] | ["characters", _] | ["characters", _, "parse"] | ["battle"] | ["battles"]
+                         | ["leaderboard"] | ["standings"]):
+                    return 405, {"error": f"Method {method} is not allowed."}
+                case _:
+                    return 404, {"error": f"No endpoint at '{split_target.path}'."}
+        except ServiceError as service_error:
+            return service_error.status, {"error": service_error.message}
+        except Exception as e:
+            logging.error(f"An error occurred while handling {method} {target}: {str(e)}")
+            return 500, {"error": "Internal server error."}
+
+
+def load_service(tier_config_fpath: str, char_config_fpath: str, csv_dir: str) -> BattleService:
+    with open(tier_config_fpath, 'r') as config_file:
+        tier_config_json = json.load(config_file)
+        validate_tier_schema(tier_config_json)
+    with open(char_config_fpath, 'r') as config_file:
+        char_config_json = json.load(config_file)
+        validate_character_schema(char_config_json)
+
+    tier_classifier = TierClassifier(tier_config_json)
+    config_store = CharacterConfigStore(char_config_fpath, char_config_json)
+    character_parser = CharacterParser(TierParser(tier_classifier), config_store, streaming=True)
+    service = BattleService(tier_classifier, character_parser)
+
+    if os.path.isdir(csv_dir):
+        for csv_file in os.listdir(csv_dir):
+            if csv_file.endswith(".csv"):
+                service.set_character(read_from_csv(os.path.join(csv_dir, csv_file), tier_classifier))
+    return service
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Serve versus battles of the parsed characters over HTTP.")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8080)
+    arg_parser.add_argument("--tier-config", default=DEFAULT_TIER_CONFIG_PATH)
+    arg_parser.add_argument("--character-config", default=DEFAULT_CHARACTER_CONFIG_PATH)
+    arg_parser.add_argument("--csv-dir", default=DEFAULT_OUTPUT_DIR,
+                            help="Directory of character csv files to load into the roster at startup.")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    battle_server = BattleServer(load_service(args.tier_config, args.character_config, args.csv_dir),
+                                 args.host, args.port)
+    asyncio.run(battle_server.serve_forever())
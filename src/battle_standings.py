@@ -0,0 +1,155 @@
+from src.battle import VersusBattleScore, versus_battle
+from src.character import FictionalCharacter, FictionalCharacterVersion
+from typing import Dict, List, Optional, Tuple
+
+
+class VersionStanding:
+    def __init__(self, version: FictionalCharacterVersion):
+        self.version = version
+        self.wins = 0
+        self.losses = 0
+        self.ties = 0
+
+    def __str__(self):
+        return f"{self.version.character_name} {self.version.version_name}: " \
+               f"{self.wins} wins, {self.losses} losses, {self.ties} ties"
+
+
+class BattleResultsCache:
+    # Keeps the result of versus_battle for every pair of tracked versions, and the wins, losses and ties of every
+    # version against all the others.
+    #
+    # Each version gets an id, and the per-stat results of a pair are stored once under (smaller id, larger id).
+    # The cache remembers the stat vector every row was computed from. When versions change, only the pairs that
+    # involve them are computed again: their old results are subtracted from the standings and the new ones are
+    # added, so bringing the standings up to date costs O(N) battles per changed version instead of O(N^2).
+    def __init__(self):
+        self.next_version_id = 0
+        # self.version_ids: Dict[int, int], maps id(version) to the id of the version in the cache
+        self.version_ids = {}
+        # self.standings: Dict[int, VersionStanding], by version id
+        self.standings = {}
+        # self.stat_vector_keys: Dict[int, Tuple], the stat vector each version's results were computed from
+        self.stat_vector_keys = {}
+        # self.pair_results: Dict[Tuple[int, int], Dict[str, int]], the battle results of (smaller id, larger id)
+        self.pair_results = {}
+
+    def __len__(self):
+        return len(self.standings)
+
+    def contains(self, version: FictionalCharacterVersion) -> bool:
+        return id(version) in self.version_ids
+
+    def add_character(self, character: FictionalCharacter):
+        for version in character.character_versions:
+            self.add_version(version)
+
+    def remove_character(self, character: FictionalCharacter):
+        for version in character.character_versions:
+            self.remove_version(version)
+
+    def replace_character(self, old_character: Optional[FictionalCharacter], new_character: FictionalCharacter):
+        # Used when a character is parsed again or merged with another one.
+        if old_character is not None:
+            self.remove_character(old_character)
+        self.add_character(new_character)
+
+    def add_version(self, version: FictionalCharacterVersion):
+        if id(version) in self.version_ids:
+            return
+        version_id = self.next_version_id
+        self.next_version_id += 1
+        self.version_ids[id(version)] = version_id
+        self.standings[version_id] = VersionStanding(version)
+        self._compute_row(version_id)
+
+    def remove_version(self, version: FictionalCharacterVersion):
+        version_id = self.version_ids.pop(id(version), None)
+        if version_id is None:
+            return
+        self._clear_row(version_id)
+        del self.standings[version_id]
+        del self.stat_vector_keys[version_id]
+
+    def update_version(self, version: FictionalCharacterVersion):
+        # Recomputes the row of a version whose tiers changed in place.
+        version_id = self.version_ids.get(id(version))
+        if version_id is None:
+            self.add_version(version)
+        else:
+            self._clear_row(version_id)
+            self._compute_row(version_id)
+
+    def refresh(self) -> int:
+        # Finds the versions whose stat vector changed since their row was computed, e.g. after a tier reload, and
+        # recomputes only their rows. Returns the number of recomputed versions.
+        dirty_version_ids = [version_id for version_id, standing in self.standings.items()
+                             if standing.version.stat_vector_key() != self.stat_vector_keys[version_id]]
+        # All the dirty rows are cleared before any of them is computed, so that the pairs between two dirty
+        # versions are only counted once.
+        for version_id in dirty_version_ids:
+            self._clear_row(version_id)
+        for version_id in dirty_version_ids:
+            self._compute_row(version_id)
+        return len(dirty_version_ids)
+
+    def get_score(self, version1: FictionalCharacterVersion, version2: FictionalCharacterVersion) \
+            -> Optional[VersusBattleScore]:
+        version_id1 = self.version_ids.get(id(version1))
+        version_id2 = self.version_ids.get(id(version2))
+        if version_id1 is None or version_id2 is None or version_id1 == version_id2:
+            return None
+        battle_results = self._get_results(version_id1, version_id2)
+        return VersusBattleScore(version1, version2, battle_results)
+
+    def get_standing(self, version: FictionalCharacterVersion) -> Optional[VersionStanding]:
+        version_id = self.version_ids.get(id(version))
+        return self.standings.get(version_id) if version_id is not None else None
+
+    def leaderboard(self, limit: int = None) -> List[VersionStanding]:
+        ranked = sorted(self.standings.values(), key=lambda standing: (-standing.wins, standing.losses))
+        return ranked[:limit] if limit is not None else ranked
+
+    def _get_results(self, version_id1: int, version_id2: int) -> Dict[str, int]:
+        # The results are stored from the point of view of the smaller id, so they are negated for the other order.
+        if version_id1 < version_id2:
+            return self.pair_results[(version_id1, version_id2)]
+        return {stat_name: -comp_int for stat_name, comp_int in self.pair_results[(version_id2, version_id1)].items()}
+
+    def _compute_row(self, version_id: int):
+        standing = self.standings[version_id]
+        self.stat_vector_keys[version_id] = standing.version.stat_vector_key()
+        for other_id, other_standing in self.standings.items():
+            if other_id == version_id or self._pair_key(version_id, other_id) in self.pair_results:
+                continue
+            pair_key = self._pair_key(version_id, other_id)
+            first, second = self.standings[pair_key[0]], self.standings[pair_key[1]]
+            battle_results = versus_battle(first.version, second.version).battle_results
+            self.pair_results[pair_key] = battle_results
+            self._apply_result(first, second, sum(battle_results.values()), 1)
+
+    def _clear_row(self, version_id: int):
+        for other_id in self.standings:
+            pair_key = self._pair_key(version_id, other_id)
+            battle_results = self.pair_results.pop(pair_key, None)
+            if battle_results is not None:
+                first, second = self.standings[pair_key[0]], self.standings[pair_key[1]]
+                self._apply_result(first, second, sum(battle_results.values()), -1)
+
+    @staticmethod
+    def _pair_key(version_id1: int, version_id2: int) -> Tuple[int, int]:
+        return (version_id1, version_id2) if version_id1 < version_id2 else (version_id2, version_id1)
+
+    @staticmethod
+    def _apply_result(first: VersionStanding, second: VersionStanding, overall_winner: int, sign: int):
+        # Adds (sign = 1) or subtracts (sign = -1) the result of a battle, using the convention of versus_battle:
+        # a negative overall score means the first version won.
+        if overall_winner < 0:
+            first.wins += sign
+            second.losses += sign
+        elif overall_winner > 0:
+            first.losses += sign
+            second.wins += sign
+        else:
+            first.ties += sign
+            second.ties += sign
@@ -1,14 +1,18 @@
 import logging
 
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from src.tier import Tier
 
 
 class FictionalCharacterVersion:
-    def __init__(self, character_name: str, version_name: str, stat_tier_map: Dict[str, Tier]):
+    def __init__(self, character_name: str, version_name: str, stat_tier_map: Dict[str, Tier],
+                 version_aliases: List[str] = None):
         self.character_name = character_name
         self.version_name = version_name
         self.stat_tier_map = stat_tier_map
+        # All the names the version is known by. The first alias is the version name itself, the others are the names
+        # of the versions that were merged into this one because they have identical stats.
+        self.version_aliases = version_aliases if version_aliases else [version_name]
 
     @classmethod
     def from_character_and_version_name(cls, character_name: str, version_name: str):
@@ -20,8 +24,24 @@ class FictionalCharacterVersion:
     def remove_stat(self, stat_name: str):
         del self.stat_tier_map[stat_name]
 
+    def stat_vector_key(self) -> Tuple:
+        # Two versions with the same key have identical stats, regardless of their names or stat order.
+        return tuple(sorted((stat_name, tier.tier_value if tier is not None else None)
+                            for stat_name, tier in self.stat_tier_map.items()))
+
+    def has_name(self, v_name: str) -> bool:
+        return v_name in self.version_aliases
+
+    def add_aliases_from_version(self, version):
+        for alias in version.version_aliases:
+            if alias not in self.version_aliases:
+                self.version_aliases.append(alias)
+
     def __str__(self):
-        return f"Character: {self.character_name}, Version: {self.version_name}\n" \
+        aliases = ""
+        if len(self.version_aliases) > 1:
+            aliases = f", Also Known As: {', '.join(self.version_aliases[1:])}"
+        return f"Character: {self.character_name}, Version: {self.version_name}{aliases}\n" \
                f"{[str(tier) for tier in self.stat_tier_map.values()]}"
 
 
@@ -36,7 +56,10 @@ class FictionalCharacter:
         return cls(character_name, [])
 
     def get_character_versions_by_name(self, v_name: str) -> List[FictionalCharacterVersion]:
-        return list(filter(lambda v: v_name in v.version_name, self.character_versions))
+        return list(filter(lambda v: any(v_name in alias for alias in v.version_aliases), self.character_versions))
+
+    def find_character_version(self, v_name: str) -> Optional[FictionalCharacterVersion]:
+        return next(filter(lambda v: v.has_name(v_name), self.character_versions), None)
 
     def add_character_version(self, version: FictionalCharacterVersion):
         self.character_versions.append(version)
@@ -44,11 +67,32 @@ class FictionalCharacter:
     def remove_character_version(self, version: FictionalCharacterVersion):
         self.character_versions.remove(version)
 
-    def add_versions_from_character(self, character):
+    def add_versions_from_character(self, character) -> List[FictionalCharacterVersion]:
+        # Returns the versions that were dropped as duplicates, see deduplicate_versions.
         if self.character_name != character.character_name:
             logging.warning(f"Merging versions from \"{character.character_name}\" into \"{self.character_name}\".\n"
                             f"This is usually done to merge character objects that refer to the same character.")
         self.character_versions.extend(character.character_versions)
+        return self.deduplicate_versions()
+
+    def deduplicate_versions(self) -> List[FictionalCharacterVersion]:
+        # Versions with identical stats are collapsed into the first of them, which keeps the names of the others as
+        # aliases. The dropped versions are returned so that anything referring to them can be updated.
+        # canonical_versions : Dict[Tuple, FictionalCharacterVersion]
+        canonical_versions = {}
+        unique_versions = []
+        duplicate_versions = []
+        for version in self.character_versions:
+            key = version.stat_vector_key()
+            canonical_version = canonical_versions.get(key)
+            if canonical_version is None:
+                canonical_versions[key] = version
+                unique_versions.append(version)
+            else:
+                canonical_version.add_aliases_from_version(version)
+                duplicate_versions.append(version)
+        self.character_versions = unique_versions
+        return duplicate_versions
 
     def __str__(self):
         return "\n".join([str(version) for version in self.character_versions])
@@ -0,0 +1,133 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from typing import Any, Dict, List, Optional
+
+
+class CharacterConfig:
+    def __init__(self, character_name: str, url: str):
+        self.character_name = character_name
+        self.url = url
+
+    def __str__(self):
+        return f"Character '{self.character_name}' is configured to the following URL: '{self.url}')"
+
+    def __eq__(self, other):
+        if isinstance(other, CharacterConfig):
+            return (
+                    self.character_name == other.character_name and
+                    self.url == other.url
+            )
+        return False
+
+
+class CharacterConfigStore:
+    # Holds the character configuration as an index from character names to URLs.
+    #
+    # Characters added at runtime are not written by rewriting the whole config file. Instead, each of them is
+    # appended as a JSON line to a journal next to the config file, which is replayed when the config is loaded.
+    # Once the journal grows past compaction_threshold entries, the index is written back to the config file and the
+    # journal is emptied. The config file is replaced atomically, so a crash leaves either the old or the new file,
+    # and replaying a journal that was already compacted only adds the same characters again.
+    #
+    # A store without a config file path keeps the configuration in memory only.
+    def __init__(self, config_fpath: Optional[str], config_file_json: Dict[str, Any],
+                 compaction_threshold: int = 1000):
+        self.config_fpath = config_fpath
+        self.journal_fpath = f"{config_fpath}.journal" if config_fpath else None
+        self.compaction_threshold = compaction_threshold
+        # self.config_json: Dict[str, Any], the loaded config, whose other keys are written back unchanged
+        self.config_json = config_file_json
+        # self.character_urls: Dict[str, str], in the order the characters were configured
+        self.character_urls = {}
+        self.journal_length = 0
+        # Set when the journal ends with an incomplete line, which the next entry must not be appended to.
+        self._journal_needs_newline = False
+
+        for character_obj in config_file_json["characters"]:
+            self.character_urls[character_obj["name"]] = character_obj["url"]
+        self._replay_journal()
+
+    @classmethod
+    def from_file(cls, config_fpath: str, compaction_threshold: int = 1000):
+        with open(config_fpath, 'r') as config_file:
+            return cls(config_fpath, json.load(config_file), compaction_threshold)
+
+    def _replay_journal(self):
+        if not self.journal_fpath or not os.path.exists(self.journal_fpath):
+            return
+        with open(self.journal_fpath, 'r') as journal_file:
+            for line_num, line in enumerate(journal_file, start=1):
+                self._journal_needs_newline = not line.endswith("\n")
+                if not line.strip():
+                    continue
+                try:
+                    character_obj = json.loads(line)
+                    self.character_urls[character_obj["name"]] = character_obj["url"]
+                    self.journal_length += 1
+                except (json.JSONDecodeError, KeyError):
+                    # A line can only be incomplete if the application stopped while appending it.
+                    logging.warning(f"Skipping the unreadable line #{line_num} of the journal '{self.journal_fpath}'.")
+
+    def __contains__(self, character_name: str) -> bool:
+        return character_name in self.character_urls
+
+    def __len__(self):
+        return len(self.character_urls)
+
+    def get_url(self, character_name: str) -> Optional[str]:
+        return self.character_urls.get(character_name)
+
+    def get_character_names(self) -> List[str]:
+        return list(self.character_urls)
+
+    def get_character_configs(self) -> List[CharacterConfig]:
+        return [CharacterConfig(name, url) for name, url in self.character_urls.items()]
+
+    def add_character(self, character_config: CharacterConfig):
+        self.character_urls[character_config.character_name] = character_config.url
+        if not self.journal_fpath:
+            return
+
+        with open(self.journal_fpath, 'a') as journal_file:
+            if self._journal_needs_newline:
+                journal_file.write("\n")
+                self._journal_needs_newline = False
+            journal_file.write(json.dumps({"name": character_config.character_name, "url": character_config.url}))
+            journal_file.write("\n")
+        self.journal_length += 1
+        if self.journal_length >= self.compaction_threshold:
+            self.compact()
+
+    def to_json(self) -> Dict[str, Any]:
+        config_json = dict(self.config_json)
+        config_json["characters"] = [{"name": name, "url": url} for name, url in self.character_urls.items()]
+        return config_json
+
+    def compact(self):
+        # Writes the whole index to the config file and empties the journal.
+        if not self.config_fpath:
+            return
+
+        directory = os.path.dirname(os.path.abspath(self.config_fpath))
+        file_descriptor, temp_fpath = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, 'w') as temp_file:
+                json.dump(self.to_json(), temp_file, indent=4)
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+            # mkstemp creates the file readable by its owner only, so the mode of the config file is kept.
+            if os.path.exists(self.config_fpath):
+                shutil.copymode(self.config_fpath, temp_fpath)
+            os.replace(temp_fpath, self.config_fpath)
+        except BaseException:
+            os.remove(temp_fpath)
+            raise
+
+        if os.path.exists(self.journal_fpath):
+            os.remove(self.journal_fpath)
+        self.journal_length = 0
+        self._journal_needs_newline = False
@@ -1,9 +1,18 @@
 import csv
+import gzip
+import io
+import logging
 import os
+import struct
 
 from . import DEFAULT_OUTPUT_DIR
 from src.character import FictionalCharacter, FictionalCharacterVersion
 from src.tier import TierClassifier
+from typing import Any, Dict, Iterator, List
+
+# The aliases of a version are written to a single cell. Version names come from the "Key:" of the character's webpage,
+# which is split by the same delimiter, so they never contain it.
+VERSION_ALIAS_DELIMITER = '|'
 
 
 def write_to_csv(character: FictionalCharacter, output_file_path: str = None):
@@ -14,8 +23,10 @@ def write_to_csv(character: FictionalCharacter, output_file_path: str = None):
     if not os.path.exists(directory):
         os.makedirs(directory)
 
-    # The names of the stats associated with the character
-    stat_names = list(character.character_versions[0].stat_tier_map.keys())
+    # The names of the stats associated with the character. Versions can lack some stats, e.g. when they could not be
+    # parsed, so the names are gathered from all the versions and the missing tiers are left empty.
+    stat_names = list(dict.fromkeys(stat_name for version in character.character_versions
+                                    for stat_name in version.stat_tier_map))
 
     # Prepare the data for writing to the CSV file
     data = [character.character_name]
@@ -26,9 +37,10 @@ def write_to_csv(character: FictionalCharacter, output_file_path: str = None):
 
     # Loop through character versions and add data for each version
     for version in character.character_versions:
-        version_data = [version.version_name]
+        version_data = [VERSION_ALIAS_DELIMITER.join(version.version_aliases)]
         for stat_name in stat_names:
-            version_data.append(version.stat_tier_map[stat_name].default_tier_name)
+            tier = version.stat_tier_map.get(stat_name)
+            version_data.append(tier.default_tier_name if tier is not None else "")
         data.append(version_data)
 
     # Write the data to a CSV file
@@ -45,13 +57,200 @@ def read_from_csv(input_file_path: str, tier_classifier: TierClassifier):
 
         character_versions = []
         for row in reader:
-            version_name = row[0]
+            version_aliases = row[0].split(VERSION_ALIAS_DELIMITER)
             version_stats = {}
             for i in range(1, len(row)):
+                if row[i] == "":
+                    continue
                 stat_name = legend[i]
                 tier_value = tier_classifier.get_tier_from_name(stat_name, row[i])
                 version_stats[stat_name] = tier_value
-            character_version = FictionalCharacterVersion(character_name, version_name, version_stats)
+            character_version = FictionalCharacterVersion(character_name, version_aliases[0], version_stats,
+                                                          version_aliases)
             character_versions.append(character_version)
 
-    return FictionalCharacter(character_name, character_versions)
+    character = FictionalCharacter(character_name, character_versions)
+    character.deduplicate_versions()
+    return character
+
+
+def character_to_dict(character: FictionalCharacter) -> Dict[str, Any]:
+    # A JSON serializable form of the character. Tiers are written by their default names, so that the dictionary
+    # can be read back with any tier configuration that knows these names.
+    return {
+        "name": character.character_name,
+        "versions": [
+            {
+                "name": version.version_name,
+                "aliases": version.version_aliases,
+                "stats": {stat_name: tier.default_tier_name if tier is not None else None
+                          for stat_name, tier in version.stat_tier_map.items()}
+            }
+            for version in character.character_versions
+        ]
+    }
+
+
+def character_from_dict(character_dict: Dict[str, Any], tier_classifier: TierClassifier) -> FictionalCharacter:
+    character_name = character_dict["name"]
+    character_versions = []
+    for version_dict in character_dict["versions"]:
+        version_stats = {}
+        for stat_name, tier_name in version_dict["stats"].items():
+            version_stats[stat_name] = tier_classifier.get_tier_from_name(stat_name, tier_name) \
+                if tier_name is not None else None
+        character_versions.append(FictionalCharacterVersion(character_name, version_dict["name"], version_stats,
+                                                            version_dict.get("aliases")))
+
+    character = FictionalCharacter(character_name, character_versions)
+    character.deduplicate_versions()
+    return character
+
+
+# The binary character format stores any number of characters in one file. Tiers are written as integer codes into a
+# dictionary of tier names kept once per stat, so a reader resolves each tier name once instead of once per cell.
+#
+# Header:  magic (4 bytes) | format version (uint8) | flags (uint8)
+# Body:    stat count (uint16) | stat names
+#          for each stat: tier count (uint16) | tier names; the code of a tier is its position + 1, 0 means no tier
+#          character count (uint32)
+#          for each character: name | version count (uint32)
+#              for each version: alias count (uint16) | aliases | one tier code (uint16) per stat
+# Strings are written as their UTF-8 length (uint32) followed by the UTF-8 bytes, all integers are little-endian.
+# When the compressed flag is set, the body is gzip compressed.
+BINARY_MAGIC = b"FCVS"
+BINARY_FORMAT_VERSION = 1
+BINARY_FLAG_COMPRESSED = 1
+BINARY_FILE_EXTENSION = ".fcvs"
+BINARY_BUFFER_SIZE = 1024 * 1024
+
+
+def _write_string(stream, string: str):
+    encoded = string.encode('utf-8')
+    stream.write(struct.pack('<I', len(encoded)))
+    stream.write(encoded)
+
+
+def _read_exactly(stream, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("Unexpected end of the binary character file.")
+    return data
+
+
+def _read_string(stream) -> str:
+    (length,) = struct.unpack('<I', _read_exactly(stream, 4))
+    return _read_exactly(stream, length).decode('utf-8')
+
+
+def write_characters_binary(characters: List[FictionalCharacter], output_file_path: str, compress: bool = False):
+    directory = os.path.dirname(output_file_path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    # The stats and the tier dictionaries are collected from the characters in memory first, so that the file can
+    # be written in a single pass.
+    # stat_codes : Dict[str, Dict[str, int]], maps each stat name to the codes of its tier names
+    stat_codes = {}
+    for character in characters:
+        for version in character.character_versions:
+            for stat_name, tier in version.stat_tier_map.items():
+                tier_codes = stat_codes.setdefault(stat_name, {})
+                if tier is not None and tier.default_tier_name not in tier_codes:
+                    tier_codes[tier.default_tier_name] = len(tier_codes) + 1
+    stat_names = list(stat_codes)
+    version_struct = struct.Struct(f'<{len(stat_names)}H')
+
+    with open(output_file_path, 'wb', buffering=BINARY_BUFFER_SIZE) as raw_file:
+        raw_file.write(BINARY_MAGIC + struct.pack('<BB', BINARY_FORMAT_VERSION,
+                                                  BINARY_FLAG_COMPRESSED if compress else 0))
+        # The small writes of the records are buffered before they reach the compressor.
+        stream = io.BufferedWriter(gzip.GzipFile(fileobj=raw_file, mode='wb'), buffer_size=BINARY_BUFFER_SIZE) \
+            if compress else raw_file
+        try:
+            stream.write(struct.pack('<H', len(stat_names)))
+            for stat_name in stat_names:
+                _write_string(stream, stat_name)
+            for stat_name in stat_names:
+                stream.write(struct.pack('<H', len(stat_codes[stat_name])))
+                for tier_name in stat_codes[stat_name]:
+                    _write_string(stream, tier_name)
+
+            stream.write(struct.pack('<I', len(characters)))
+            for character in characters:
+                _write_string(stream, character.character_name)
+                stream.write(struct.pack('<I', len(character.character_versions)))
+                for version in character.character_versions:
+                    stream.write(struct.pack('<H', len(version.version_aliases)))
+                    for alias in version.version_aliases:
+                        _write_string(stream, alias)
+                    codes = []
+                    for stat_name in stat_names:
+                        tier = version.stat_tier_map.get(stat_name)
+                        codes.append(stat_codes[stat_name][tier.default_tier_name] if tier is not None else 0)
+                    stream.write(version_struct.pack(*codes))
+        finally:
+            if compress:
+                stream.close()
+
+
+def iter_characters_from_binary(input_file_path: str, tier_classifier: TierClassifier) \
+        -> Iterator[FictionalCharacter]:
+    # Yields the characters of the file one at a time and in the order they were written, following the character
+    # records. Characters without versions and consecutive characters with the same name are kept as they were written.
+    # Stats without a tier, or whose tier name is not configured, are left out of the versions.
+    with open(input_file_path, 'rb', buffering=BINARY_BUFFER_SIZE) as raw_file:
+        if _read_exactly(raw_file, len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError(f"'{input_file_path}' is not a binary character file.")
+        format_version, flags = struct.unpack('<BB', _read_exactly(raw_file, 2))
+        if format_version != BINARY_FORMAT_VERSION:
+            raise ValueError(f"Unsupported binary character file version: {format_version}.")
+        stream = gzip.GzipFile(fileobj=raw_file, mode='rb') if flags & BINARY_FLAG_COMPRESSED else raw_file
+
+        (stat_count,) = struct.unpack('<H', _read_exactly(stream, 2))
+        stat_names = [_read_string(stream) for _ in range(stat_count)]
+        # stat_code_tiers : List[List[Optional[Tier]]], the tier of each code of each stat; code 0 is no tier
+        stat_code_tiers = []
+        for stat_name in stat_names:
+            (tier_count,) = struct.unpack('<H', _read_exactly(stream, 2))
+            code_tiers = [None]
+            for _ in range(tier_count):
+                tier_name = _read_string(stream)
+                tier = tier_classifier.get_tier_from_synonyms(stat_name, [tier_name])
+                if tier is None:
+                    logging.warning(f"The tier '{tier_name}' of the stat '{stat_name}' is not configured.")
+                code_tiers.append(tier)
+            stat_code_tiers.append(code_tiers)
+        version_struct = struct.Struct(f'<{stat_count}H')
+
+        (character_count,) = struct.unpack('<I', _read_exactly(stream, 4))
+        for _ in range(character_count):
+            character_name = _read_string(stream)
+            (version_count,) = struct.unpack('<I', _read_exactly(stream, 4))
+            character_versions = []
+            for _ in range(version_count):
+                (alias_count,) = struct.unpack('<H', _read_exactly(stream, 2))
+                version_aliases = [_read_string(stream) for _ in range(alias_count)]
+                codes = version_struct.unpack(_read_exactly(stream, version_struct.size))
+                version_stats = {}
+                for stat_name, code_tiers, code in zip(stat_names, stat_code_tiers, codes):
+                    if code_tiers[code] is not None:
+                        version_stats[stat_name] = code_tiers[code]
+                character_versions.append(FictionalCharacterVersion(character_name, version_aliases[0],
+                                                                    version_stats, version_aliases))
+            yield FictionalCharacter(character_name, character_versions)
+
+
+def iter_versions_from_binary(input_file_path: str, tier_classifier: TierClassifier) \
+        -> Iterator[FictionalCharacterVersion]:
+    # Yields the versions of all the characters in the file, one at a time and in the order they were written.
+    for character in iter_characters_from_binary(input_file_path, tier_classifier):
+        yield from character.character_versions
+
+
+def read_characters_binary(input_file_path: str, tier_classifier: TierClassifier) -> List[FictionalCharacter]:
+    characters = []
+    for character in iter_characters_from_binary(input_file_path, tier_classifier):
+        character.deduplicate_versions()
+        characters.append(character)
+    return characters
@@ -1,54 +1,143 @@
+import html
 import requests
 import logging
 import itertools
 
 from bs4 import BeautifulSoup
+from html.parser import HTMLParser
 from src.character import FictionalCharacter, FictionalCharacterVersion
+from src.character_config_store import CharacterConfig, CharacterConfigStore
 from src.tier_parser import TierParser
-from typing import List
-
-
-class CharacterConfig:
-    def __init__(self, character_name: str, url: str):
-        self.character_name = character_name
-        self.url = url
-
-    def __str__(self):
-        return f"Character '{self.character_name}' is configured to the following URL: '{self.url}')"
-
-    def __eq__(self, other):
-        if isinstance(other, CharacterConfig):
-            return (
-                    self.character_name == other.character_name and
-                    self.url == other.url
-            )
-        return False
+from typing import List, Optional
+
+
+class StatParagraphCollector(HTMLParser):
+    # An incremental HTML parser that keeps only the paragraphs CharacterParser reads from a character's webpage: the
+    # paragraph containing the "Key:" text and the paragraphs whose bold text links to the page of a stat. The kept
+    # paragraphs are rebuilt as HTML, and the collector is done once the key and every stat have been seen, so the
+    # rest of the page does not have to be downloaded.
+    # Like the lookups of CharacterParser, only the first "Key:" text and the first link to each stat are considered.
+    # HTMLParser may hand over a text in several pieces when it spans chunks, so texts are only checked once complete.
+    def __init__(self, stat_names: List[str]):
+        super().__init__(convert_charrefs=True)
+        # self.stat_hrefs: Dict[str, str], maps the link of each stat to the stat name
+        self.stat_hrefs = {f"/wiki/{stat_name.strip().replace(' ', '_')}": stat_name for stat_name in stat_names}
+        # self.seen_stats: Set[str], the stats whose first link was already seen, inside a kept paragraph or not
+        self.seen_stats = set()
+        self.key_seen = False
+        # self.paragraphs: List[str], the HTML of the kept paragraphs
+        self.paragraphs = []
+
+        # The state of the paragraph being read
+        # self._paragraph_parts: Optional[List[str]], None outside of paragraphs
+        self._paragraph_parts = None
+        self._paragraph_is_kept = False
+        self._bold_depth = 0
+        # self._text_parts: List[str], the pieces of the text being read
+        self._text_parts = []
+
+    def is_done(self) -> bool:
+        # A kept paragraph that is still open may continue in the next chunks.
+        return self.key_seen and len(self.seen_stats) == len(self.stat_hrefs) and not self._paragraph_is_kept
+
+    def close(self):
+        super().close()
+        self._end_text()
+        self._end_paragraph()
+
+    def get_html(self) -> str:
+        return "<html><body>" + "".join(self.paragraphs) + "</body></html>"
+
+    def handle_starttag(self, tag, attrs):
+        self._end_text()
+        if tag == 'p':
+            # Paragraphs cannot be nested, a new paragraph closes the current one.
+            self._end_paragraph()
+            self._paragraph_parts = []
+            self._paragraph_is_kept = False
+            self._bold_depth = 0
+        elif tag == 'b' and self._paragraph_parts is not None:
+            self._bold_depth += 1
+        elif tag == 'a':
+            stat_name = self.stat_hrefs.get(dict(attrs).get('href'))
+            if stat_name is not None and stat_name not in self.seen_stats:
+                self.seen_stats.add(stat_name)
+                if self._paragraph_parts is not None and self._bold_depth > 0:
+                    self._paragraph_is_kept = True
+        if self._paragraph_parts is not None:
+            self._paragraph_parts.append(self.get_starttag_text())
+
+    def handle_startendtag(self, tag, attrs):
+        self._end_text()
+        if self._paragraph_parts is not None:
+            self._paragraph_parts.append(self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        self._end_text()
+        if self._paragraph_parts is None:
+            return
+        if tag == 'p':
+            self._paragraph_parts.append("</p>")
+            self._end_paragraph()
+        elif tag in ('div', 'td', 'li', 'body'):
+            # The container of an unclosed paragraph ended.
+            self._end_paragraph()
+        else:
+            if tag == 'b' and self._bold_depth > 0:
+                self._bold_depth -= 1
+            self._paragraph_parts.append(f"</{tag}>")
+
+    def handle_data(self, data):
+        self._text_parts.append(data)
+        if self._paragraph_parts is not None:
+            self._paragraph_parts.append(html.escape(data, quote=False))
+
+    def _end_text(self):
+        if not self._text_parts:
+            return
+        text = "".join(self._text_parts)
+        self._text_parts = []
+        if not self.key_seen and text == "Key:":
+            self.key_seen = True
+            if self._paragraph_parts is not None:
+                self._paragraph_is_kept = True
+
+    def _end_paragraph(self):
+        if self._paragraph_parts is not None and self._paragraph_is_kept:
+            self.paragraphs.append("".join(self._paragraph_parts))
+        self._paragraph_parts = None
+        self._paragraph_is_kept = False
 
 
 class CharacterParser:
-    def __init__(self, tier_parser: TierParser, config_file_json):
-        self.config_json = config_file_json
-        self._read_config()
+    # When streaming is enabled, webpages are downloaded in chunks and only the paragraphs that are parsed are kept,
+    # see StatParagraphCollector. Otherwise, the whole webpage is downloaded and parsed.
+    def __init__(self, tier_parser: TierParser, config_store: CharacterConfigStore, streaming: bool = False):
+        self.config_store = config_store
         self.tier_parser = tier_parser
+        self.streaming = streaming
+        self.stream_chunk_size = 16 * 1024
 
-    def _read_config(self):
-        character_configs = []
-        for character_obj in self.config_json["characters"]:
-            character_configs.append(CharacterConfig(character_obj["name"], character_obj["url"]))
-        self.character_configs = character_configs
-
-    def _get_web_page(self, character_name: str):
-        url = None
-        for character in self.character_configs:
-            if character.character_name == character_name:
-                url = character.url
-                break
-        if not url:
-            raise ValueError(f"Character '{character_name}' not found in the configuration.")
+    @staticmethod
+    def _get_web_page(url: str):
         response = requests.get(url)
         response.raise_for_status()  # Raise an HTTPError for bad responses
         return response.text
 
+    def _stream_web_page(self, url: str):
+        collector = StatParagraphCollector(self.tier_parser.stat_names)
+        with requests.get(url, stream=True) as response:
+            response.raise_for_status()  # Raise an HTTPError for bad responses
+            if response.encoding is None:
+                response.encoding = 'utf-8'
+            for chunk in response.iter_content(chunk_size=self.stream_chunk_size, decode_unicode=True):
+                collector.feed(chunk)
+                if collector.is_done():
+                    # Leaving the with block closes the connection without reading the rest of the webpage.
+                    break
+        collector.close()
+        return collector.get_html()
+
     @staticmethod
     def _flatten_children_text(parent_element):
         # Initialize an empty list to store text from children
@@ -85,8 +174,13 @@ class CharacterParser:
             return []
 
     def parse_character(self, character_name: str) -> FictionalCharacter:
+        return self.parse_character_from_url(character_name, self.config_store.get_url(character_name))
+
+    def parse_character_from_url(self, character_name: str, url: Optional[str]) -> FictionalCharacter:
         try:
-            page_content = self._get_web_page(character_name)
+            if not url:
+                raise ValueError(f"Character '{character_name}' not found in the configuration.")
+            page_content = self._stream_web_page(url) if self.streaming else self._get_web_page(url)
             soup = BeautifulSoup(page_content, 'html.parser')
 
             # We first begin by parsing the key. This tells us the names of the versions of the character the
@@ -154,10 +248,13 @@ class CharacterParser:
                     logging.warning(f"Information for the stat '{stat_name}' could not be parsed from the webpage.")
                     stats_and_values[stat_name] = []
 
-            return FictionalCharacter(character_name, character_versions)
+            # The elongation of the tier values frequently gives several versions identical stats.
+            character = FictionalCharacter(character_name, character_versions)
+            character.deduplicate_versions()
+            return character
 
         except Exception as e:
             # If there was an error before parsing the stats of the characters begin, we just return
             # an empty character object.
-            logging.error("An error occurred: ", str(e))
+            logging.error(f"An error occurred: {str(e)}")
             return FictionalCharacter.from_character_name(character_name)
@@ -8,13 +8,30 @@ def validate_character_schema(character_config_json):
     try:
         with open(DEFAULT_CHARACTER_CONFIG_SCHEMA_PATH, 'r') as config_file:
             schema = json.load(config_file)
-            validate(character_config_json, schema)
+            # Validating every character with jsonschema is slow for large configs, so the schema is only applied to
+            # the top level and the characters are checked directly against the item schema's required fields.
+            characters_schema = schema["properties"]["characters"]
+            top_level_schema = {**schema, "properties": {**schema["properties"], "characters": {
+                key: value for key, value in characters_schema.items() if key != "items"}}}
+            validate(character_config_json, top_level_schema)
+            for i, character_obj in enumerate(character_config_json["characters"]):
+                _validate_character_obj(i, character_obj)
     except FileNotFoundError:
         raise FileNotFoundError(f"Character config schema file not found: {DEFAULT_CHARACTER_CONFIG_SCHEMA_PATH}")
     except ValidationError:
         raise
 
 
+def _validate_character_obj(i: int, character_obj):
+    if not isinstance(character_obj, dict):
+        raise ValidationError(f"Character #{i} of the config is not an object.")
+    name, url = character_obj.get("name"), character_obj.get("url")
+    if not isinstance(name, str) or name == "":
+        raise ValidationError(f"Character #{i} of the config does not have a name.")
+    if not isinstance(url, str):
+        raise ValidationError(f"Character '{name}' of the config does not have a URL.")
+
+
 def validate_tier_schema(tier_config_json):
     try:
         with open(DEFAULT_TIER_CONFIG_SCHEMA_PATH, 'r') as config_file:
@@ -0,0 +1,60 @@
+from src.character import FictionalCharacterVersion
+from src.roster_index import RosterIndex
+from typing import Dict, List, Tuple
+
+# A version dominates another version when it is at least as good in every stat and strictly better in at least one
+# of them. Versions that are not dominated by any other version form the Pareto frontier (the skyline) of the roster.
+
+
+def dominates(vector1: Tuple[int, ...], vector2: Tuple[int, ...]) -> bool:
+    return vector1 != vector2 and all(value1 >= value2 for value1, value2 in zip(vector1, vector2))
+
+
+def pareto_frontier(roster_index: RosterIndex) -> List[FictionalCharacterVersion]:
+    # A distinct stat vector is on the frontier when no indexed version dominates it. The check intersects one
+    # cumulative bitset per stat and stops as soon as the intersection is empty, so comparing a vector with the whole
+    # roster costs a few bitwise operations. Versions sharing a vector are handled together.
+    frontier_bitset = 0
+    for vector, slots in roster_index.vector_bitsets.items():
+        if not _dominators_bitset(roster_index, vector):
+            frontier_bitset |= slots
+    return roster_index.versions_of_bitset(frontier_bitset)
+
+
+def _dominators_bitset(roster_index: RosterIndex, vector: Tuple[int, ...]) -> int:
+    bitset = roster_index.slots_bitset
+    for stat_index, tier_value in enumerate(vector):
+        bitset &= roster_index.at_least(stat_index, tier_value)
+        if not bitset:
+            return 0
+    return bitset & ~roster_index.equal_vector_bitset(vector)
+
+
+def _dominated_bitset(roster_index: RosterIndex, vector: Tuple[int, ...]) -> int:
+    bitset = roster_index.slots_bitset
+    for stat_index, tier_value in enumerate(vector):
+        bitset &= roster_index.at_most(stat_index, tier_value)
+        if not bitset:
+            return 0
+    return bitset & ~roster_index.equal_vector_bitset(vector)
+
+
+def dominators_of(roster_index: RosterIndex, version: FictionalCharacterVersion) -> List[FictionalCharacterVersion]:
+    # The version does not have to be indexed; it is compared to the indexed roster by its stat vector.
+    return roster_index.versions_of_bitset(_dominators_bitset(roster_index, roster_index.stat_vector(version)))
+
+
+def dominated_by(roster_index: RosterIndex, version: FictionalCharacterVersion) -> List[FictionalCharacterVersion]:
+    return roster_index.versions_of_bitset(_dominated_bitset(roster_index, roster_index.stat_vector(version)))
+
+
+def dominance_counts(roster_index: RosterIndex) -> Dict[FictionalCharacterVersion, Tuple[int, int]]:
+    # Maps every indexed version to the number of versions it dominates and the number of versions dominating it.
+    # The counts only depend on the stat vector, so they are computed once per distinct vector.
+    counts = {}
+    for vector, slots in roster_index.vector_bitsets.items():
+        vector_counts = (_dominated_bitset(roster_index, vector).bit_count(),
+                         _dominators_bitset(roster_index, vector).bit_count())
+        for version in roster_index.versions_of_bitset(slots):
+            counts[version] = vector_counts
+    return counts
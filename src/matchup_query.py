@@ -0,0 +1,61 @@
+from src.character import FictionalCharacterVersion
+from src.roster_index import RosterIndex, iterate_bitset
+from src.tier import TierClassifier
+from typing import Dict, List
+
+# Matchup queries answered from the bitsets of a RosterIndex. A version beats another version in a stat when its tier
+# value is strictly greater, which is the same rule versus_battle applies stat by stat. Like versus_battle, a stat
+# without a tier value in either version is not compared, so the index's value 0 never wins or loses.
+
+
+def versions_beating(roster_index: RosterIndex, version: FictionalCharacterVersion, min_stat_wins: int) \
+        -> List[FictionalCharacterVersion]:
+    vector = roster_index.stat_vector(version)
+    # Versions stored as 0 are below any tier, so at_least already leaves them out. When the given version has no
+    # tier value itself, nobody can beat it in that stat.
+    stat_win_bitsets = [roster_index.at_least(stat_index, tier_value + 1) if tier_value > 0 else 0
+                        for stat_index, tier_value in enumerate(vector)]
+
+    if min_stat_wins <= 0:
+        return roster_index.versions_of_bitset(roster_index.slots_bitset)
+    if min_stat_wins > len(stat_win_bitsets):
+        return []
+
+    # at_least_wins[j] is the bitset of the versions beating the given version in at least j of the stats seen so
+    # far. Every stat can raise a version from j - 1 wins to j wins, so the counts are kept with bitwise operations
+    # instead of a counter per version.
+    at_least_wins = [roster_index.slots_bitset] + [0] * min_stat_wins
+    for stat_number, win_bitset in enumerate(stat_win_bitsets, start=1):
+        for j in range(min(stat_number, min_stat_wins), 0, -1):
+            at_least_wins[j] |= at_least_wins[j - 1] & win_bitset
+    return roster_index.versions_of_bitset(at_least_wins[min_stat_wins])
+
+
+def versions_with_minimum_tiers(roster_index: RosterIndex, tier_classifier: TierClassifier,
+                                minimum_tiers: Dict[str, str]) -> List[FictionalCharacterVersion]:
+    # minimum_tiers maps stat names to tier names, e.g. {"Speed": "FTL", "Durability": "4-C"}.
+    bitset = roster_index.slots_bitset
+    for stat_name, tier_name in minimum_tiers.items():
+        if stat_name not in roster_index.stat_names:
+            raise ValueError(f"The stat '{stat_name}' is not indexed.")
+        tier = tier_classifier.get_tier_from_name(stat_name, tier_name)
+        bitset &= roster_index.at_least(roster_index.stat_names.index(stat_name), tier.tier_value)
+    return roster_index.versions_of_bitset(bitset)
+
+
+def top_versions_of_stat(roster_index: RosterIndex, stat_name: str, k: int) -> List[FictionalCharacterVersion]:
+    # Walks the tier values of the stat from the highest down, so only the values needed for k versions are visited.
+    # Versions sharing a tier value are returned in slot order, and versions without a tier value are left out.
+    if stat_name not in roster_index.stat_names:
+        raise ValueError(f"The stat '{stat_name}' is not indexed.")
+    stat_index = roster_index.stat_names.index(stat_name)
+
+    top_versions = []
+    for tier_value in roster_index.values_of_stat(stat_index):
+        if tier_value == 0:
+            break
+        for slot in iterate_bitset(roster_index.value_bitsets[stat_index][tier_value]):
+            if len(top_versions) == k:
+                return top_versions
+            top_versions.append(roster_index.versions[slot])
+    return top_versions
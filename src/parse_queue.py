@@ -0,0 +1,323 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from . import DEFAULT_CHARACTER_CONFIG_PATH, DEFAULT_TIER_CONFIG_PATH
+from src.character import FictionalCharacter
+from src.character_config_store import CharacterConfigStore
+from src.character_io import character_from_dict, character_to_dict
+from src.character_parser import CharacterParser
+from src.config_validation import validate_tier_schema
+from src.tier import TierClassifier
+from src.tier_parser import TierParser
+from typing import Dict, List, Tuple
+
+JOB_PENDING = "pending"
+JOB_LEASED = "leased"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class ParseJob:
+    def __init__(self, job_id: int, character_name: str, url: str, attempts: int):
+        self.job_id = job_id
+        self.character_name = character_name
+        self.url = url
+        self.attempts = attempts
+
+    def __str__(self):
+        return f"Job #{self.job_id}: '{self.character_name}' ({self.url}), attempt #{self.attempts}"
+
+
+class ParseJobQueue:
+    # A queue of characters to parse, stored in a table of a SQLite database that any number of worker processes can
+    # share. A worker claims jobs by leasing them for lease_seconds and keeps the leases alive with heartbeats. Jobs whose
+    # lease expires, e.g. because their worker died, can be claimed again, and jobs that failed are retried until
+    # they have been attempted max_attempts times.
+    #
+    # Claims run in "BEGIN IMMEDIATE" transactions, which take the database's write lock before reading, so a job is
+    # never leased to two workers at once. Every thread uses its own connection.
+    #
+    # By default the database runs in WAL mode, which lets readers proceed during writes but keeps its index in shared
+    # memory, so every worker must run on the host that stores the database file. With shared_filesystem, the
+    # database uses a rollback journal instead, which only relies on the file locks of the filesystem, so workers on
+    # several hosts can share a database file on a network filesystem such as NFS. In that mode:
+    # - the filesystem must implement POSIX byte-range locks correctly, e.g. NFS with its lock service running; a
+    #   filesystem with broken locks can lease a job twice or corrupt the database,
+    # - every worker sharing a database file must use the same mode, since a WAL connection switches the file to WAL,
+    # - readers wait for writers, and every commit is synced to the server, so claims are slower,
+    # - leases are compared with the clock of the host running each query, so the clocks of the hosts must differ by
+    #   much less than lease_seconds.
+    def __init__(self, db_fpath: str, lease_seconds: float = 60.0, max_attempts: int = 3,
+                 shared_filesystem: bool = False):
+        self.db_fpath = db_fpath
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.shared_filesystem = shared_filesystem
+        self._local = threading.local()
+        self._create_table()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit mode; transactions are started explicitly where they are needed.
+            connection = sqlite3.connect(self.db_fpath, timeout=60.0, isolation_level=None)
+            if self.shared_filesystem:
+                connection.execute("PRAGMA journal_mode=DELETE")
+                connection.execute("PRAGMA synchronous=FULL")
+            else:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _create_table(self):
+        connection = self._connection()
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS parse_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                character_name TEXT NOT NULL,
+                url TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                result TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL
+            )""")
+        connection.execute("CREATE INDEX IF NOT EXISTS parse_jobs_by_status ON parse_jobs (status, lease_expires_at)")
+
+    def close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def enqueue(self, jobs: List[Tuple[str, str]]) -> int:
+        # jobs : List[(character name, url)]
+        now = time.time()
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                "INSERT INTO parse_jobs (character_name, url, status, max_attempts, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(character_name, url, JOB_PENDING, self.max_attempts, now) for character_name, url in jobs])
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return len(jobs)
+
+    def claim(self, worker_id: str, count: int = 1) -> List[ParseJob]:
+        now = time.time()
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Leases that expired after the last attempt are not retried.
+            connection.execute(
+                "UPDATE parse_jobs SET status = ?, lease_owner = NULL, error = ?, updated_at = ? "
+                "WHERE status = ? AND lease_expires_at < ? AND attempts >= max_attempts",
+                (JOB_FAILED, "The lease expired.", now, JOB_LEASED, now))
+            rows = connection.execute(
+                "SELECT id, character_name, url, attempts FROM parse_jobs "
+                "WHERE status = ? OR (status = ? AND lease_expires_at < ?) ORDER BY id LIMIT ?",
+                (JOB_PENDING, JOB_LEASED, now, count)).fetchall()
+            connection.executemany(
+                "UPDATE parse_jobs SET status = ?, lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE id = ?",
+                [(JOB_LEASED, worker_id, now + self.lease_seconds, now, row[0]) for row in rows])
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return [ParseJob(job_id, character_name, url, attempts + 1) for job_id, character_name, url, attempts in rows]
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        # Extends the lease of a job. Returns False if the worker no longer holds the lease.
+        now = time.time()
+        cursor = self._connection().execute(
+            "UPDATE parse_jobs SET lease_expires_at = ?, updated_at = ? "
+            "WHERE id = ? AND status = ? AND lease_owner = ?",
+            (now + self.lease_seconds, now, job_id, JOB_LEASED, worker_id))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, result: str) -> bool:
+        # Stores the result of a job. Returns False if the lease was lost, in which case the result is dropped since
+        # another worker may already be parsing the character.
+        cursor = self._connection().execute(
+            "UPDATE parse_jobs SET status = ?, result = ?, error = NULL, lease_owner = NULL, updated_at = ? "
+            "WHERE id = ? AND status = ? AND lease_owner = ?",
+            (JOB_DONE, result, time.time(), job_id, JOB_LEASED, worker_id))
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        # Puts the job back in the queue, or marks it as failed once it has been attempted max_attempts times.
+        cursor = self._connection().execute(
+            "UPDATE parse_jobs SET status = CASE WHEN attempts < max_attempts THEN ? ELSE ? END, error = ?, "
+            "lease_owner = NULL, lease_expires_at = NULL, updated_at = ? "
+            "WHERE id = ? AND status = ? AND lease_owner = ?",
+            (JOB_PENDING, JOB_FAILED, error, time.time(), job_id, JOB_LEASED, worker_id))
+        return cursor.rowcount == 1
+
+    def get_status_counts(self) -> Dict[str, int]:
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM parse_jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def has_unfinished_jobs(self) -> bool:
+        row = self._connection().execute("SELECT 1 FROM parse_jobs WHERE status IN (?, ?) LIMIT 1",
+                                         (JOB_PENDING, JOB_LEASED)).fetchone()
+        return row is not None
+
+    def get_results(self) -> List[Tuple[str, str]]:
+        # The (character name, result) pairs of the finished jobs, in the order the jobs were enqueued.
+        return self._connection().execute("SELECT character_name, result FROM parse_jobs WHERE status = ? ORDER BY id",
+                                          (JOB_DONE,)).fetchall()
+
+    def load_characters(self, tier_classifier: TierClassifier) -> List[FictionalCharacter]:
+        return [character_from_dict(json.loads(result), tier_classifier) for _, result in self.get_results()]
+
+
+class ParseWorker:
+    # Claims jobs from a ParseJobQueue, parses the characters and writes them back as JSON, see character_to_dict.
+    # While the claimed jobs are processed, a background thread renews the leases of all the jobs that are not
+    # finished yet, including the ones still waiting for their turn.
+    def __init__(self, job_queue: ParseJobQueue, character_parser: CharacterParser, worker_id: str = None,
+                 claim_count: int = 1):
+        self.job_queue = job_queue
+        self.character_parser = character_parser
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.claim_count = claim_count
+        self.heartbeat_interval = job_queue.lease_seconds / 3
+
+    def run(self, stop_when_empty: bool = True, poll_interval: float = 1.0) -> int:
+        # Returns the number of jobs this worker completed.
+        completed_count = 0
+        while True:
+            jobs = self.job_queue.claim(self.worker_id, self.claim_count)
+            if len(jobs) == 0:
+                if stop_when_empty and not self.job_queue.has_unfinished_jobs():
+                    return completed_count
+                # Other workers still hold leases that may expire, so the queue is polled again.
+                time.sleep(poll_interval)
+                continue
+            completed_count += self.run_jobs(jobs)
+
+    def run_job(self, job: ParseJob) -> bool:
+        return self.run_jobs([job]) == 1
+
+    def run_jobs(self, jobs: List[ParseJob]) -> int:
+        # Returns the number of the given jobs that were completed.
+        # held_jobs : Dict[int, ParseJob], the unfinished jobs by id, shared with the heartbeat thread
+        held_jobs = {job.job_id: job for job in jobs}
+        held_jobs_lock = threading.Lock()
+        stop_heartbeat = threading.Event()
+        heartbeat_thread = threading.Thread(target=self._send_heartbeats,
+                                            args=(held_jobs, held_jobs_lock, stop_heartbeat), daemon=True)
+        heartbeat_thread.start()
+        completed_count = 0
+        try:
+            for job in jobs:
+                character = self.character_parser.parse_character_from_url(job.character_name, job.url)
+                # The job stops being renewed before it is finished, so that finishing it is not reported as a lost
+                # lease by the heartbeat thread.
+                with held_jobs_lock:
+                    held_jobs.pop(job.job_id, None)
+                if self._finish_job(job, character):
+                    completed_count += 1
+        finally:
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+        return completed_count
+
+    def _finish_job(self, job: ParseJob, character: FictionalCharacter) -> bool:
+        # The parser logs its errors and returns a character without versions when a character cannot be parsed.
+        if len(character.character_versions) == 0:
+            logging.warning(f"{str(job)} could not be parsed.")
+            self.job_queue.fail(job.job_id, self.worker_id, "The character could not be parsed.")
+            return False
+        return self.job_queue.complete(job.job_id, self.worker_id, json.dumps(character_to_dict(character)))
+
+    def _send_heartbeats(self, held_jobs: Dict[int, ParseJob], held_jobs_lock: threading.Lock,
+                         stop_heartbeat: threading.Event):
+        while not stop_heartbeat.wait(self.heartbeat_interval):
+            with held_jobs_lock:
+                jobs = list(held_jobs.values())
+            for job in jobs:
+                if not self.job_queue.heartbeat(job.job_id, self.worker_id):
+                    with held_jobs_lock:
+                        # A job that was finished in the meantime did not lose its lease.
+                        if held_jobs.pop(job.job_id, None) is not None:
+                            logging.warning(f"The lease of {str(job)} was lost.")
+        self.job_queue.close()
+
+
+def _load_tier_parser(tier_config_fpath: str) -> TierParser:
+    with open(tier_config_fpath, 'r') as config_file:
+        tier_config_json = json.load(config_file)
+        validate_tier_schema(tier_config_json)
+    return TierParser(TierClassifier(tier_config_json))
+
+
+def run_worker_process(db_fpath: str, tier_config_fpath: str, lease_seconds: float, claim_count: int,
+                       stop_when_empty: bool, shared_filesystem: bool = False) -> int:
+    # The entry point of a worker process. The jobs carry their URLs, so the workers need no character config.
+    empty_config_store = CharacterConfigStore(None, {"characters": []})
+    character_parser = CharacterParser(_load_tier_parser(tier_config_fpath), empty_config_store, streaming=True)
+    job_queue = ParseJobQueue(db_fpath, lease_seconds, shared_filesystem=shared_filesystem)
+    try:
+        return ParseWorker(job_queue, character_parser, claim_count=claim_count).run(stop_when_empty)
+    finally:
+        job_queue.close()
+
+
+def run_workers(db_fpath: str, tier_config_fpath: str, process_count: int, lease_seconds: float = 60.0,
+                claim_count: int = 1, stop_when_empty: bool = True, shared_filesystem: bool = False) -> int:
+    # Runs process_count local worker processes until the queue is empty and returns the number of completed jobs.
+    # Other hosts can run the same function against the same database file when it is on a shared filesystem and
+    # shared_filesystem is set, see ParseJobQueue.
+    with multiprocessing.Pool(process_count) as pool:
+        completed_counts = pool.starmap(run_worker_process,
+                                        [(db_fpath, tier_config_fpath, lease_seconds, claim_count, stop_when_empty,
+                                          shared_filesystem)] * process_count)
+    return sum(completed_counts)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Parse characters with a queue shared by worker processes.")
+    arg_parser.add_argument("command", choices=["enqueue", "work", "status"])
+    arg_parser.add_argument("--db", required=True, help="Path to the SQLite database of the queue.")
+    arg_parser.add_argument("--tier-config", default=DEFAULT_TIER_CONFIG_PATH)
+    arg_parser.add_argument("--character-config", default=DEFAULT_CHARACTER_CONFIG_PATH)
+    arg_parser.add_argument("--processes", type=int, default=os.cpu_count())
+    arg_parser.add_argument("--lease-seconds", type=float, default=60.0)
+    arg_parser.add_argument("--max-attempts", type=int, default=3)
+    arg_parser.add_argument("--keep-polling", action="store_true",
+                            help="Keep waiting for new jobs instead of stopping when the queue is empty.")
+    arg_parser.add_argument("--shared-filesystem", action="store_true",
+                            help="Use a rollback journal, so that workers on several hosts can share a database on a "
+                                 "network filesystem. Every command on the same database must use this flag.")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    match args.command:
+        case "enqueue":
+            config_store = CharacterConfigStore.from_file(args.character_config)
+            queue = ParseJobQueue(args.db, args.lease_seconds, args.max_attempts, args.shared_filesystem)
+            count = queue.enqueue([(config.character_name, config.url)
+                                   for config in config_store.get_character_configs()])
+            print(f"{count} character(s) were added to the queue.")
+        case "work":
+            count = run_workers(args.db, args.tier_config, args.processes, args.lease_seconds,
+                                stop_when_empty=not args.keep_polling, shared_filesystem=args.shared_filesystem)
+            print(f"{count} character(s) were parsed.")
+        case "status":
+            print(ParseJobQueue(args.db, shared_filesystem=args.shared_filesystem).get_status_counts())
@@ -0,0 +1,163 @@
+import bisect
+
+from src.character import FictionalCharacter, FictionalCharacterVersion
+from typing import Iterable, List, Tuple
+
+
+def iterate_bitset(bitset: int) -> Iterable[int]:
+    # Yields the positions of the set bits, from the lowest to the highest.
+    while bitset:
+        lowest_bit = bitset & -bitset
+        yield lowest_bit.bit_length() - 1
+        bitset ^= lowest_bit
+
+
+# The roster index packs the tier values of character versions into stat vectors and indexes them with bitsets.
+# Every indexed version occupies a slot, and for every stat the index keeps one bitset (a Python int) per tier value
+# holding the slots of the versions with that value. Questions such as "which versions have at least this tier in this
+# stat" then become a handful of bitwise operations instead of a loop over the roster.
+# A stat without a tier value is stored as 0, which is below every configured tier.
+class RosterIndex:
+    def __init__(self, stat_names: List[str]):
+        self.stat_names = list(stat_names)
+        # self.versions: List[FictionalCharacterVersion], indexed by slot
+        self.versions = []
+        # self.vectors: List[Tuple[int, ...]], indexed by slot
+        self.vectors = []
+        # self.version_slots: Dict[int, int], maps id(version) to its slot
+        self.version_slots = {}
+        # self.slots_bitset: int, the bitset of all the occupied slots
+        self.slots_bitset = 0
+        # self.free_slots: List[int], slots of removed versions that can be reused
+        self.free_slots = []
+        # self.value_bitsets: List[Dict[int, int]], maps each tier value of a stat to a bitset of slots
+        self.value_bitsets = [{} for _ in self.stat_names]
+        # self.vector_bitsets: Dict[Tuple[int, ...], int], maps each distinct stat vector to a bitset of slots
+        self.vector_bitsets = {}
+        # Cumulative bitsets are derived from value_bitsets lazily and dropped whenever the index changes.
+        # self._at_least_cache: List[Optional[Tuple[List[int], List[int]]]]
+        self._at_least_cache = [None for _ in self.stat_names]
+        self._at_most_cache = [None for _ in self.stat_names]
+
+    @classmethod
+    def from_characters(cls, stat_names: List[str], characters: Iterable[FictionalCharacter]):
+        index = cls(stat_names)
+        for character in characters:
+            index.add_character(character)
+        return index
+
+    def stat_vector(self, version: FictionalCharacterVersion) -> Tuple[int, ...]:
+        vector = []
+        for stat_name in self.stat_names:
+            tier = version.stat_tier_map.get(stat_name)
+            vector.append(tier.tier_value if tier is not None else 0)
+        return tuple(vector)
+
+    def add_character(self, character: FictionalCharacter):
+        for version in character.character_versions:
+            self.add_version(version)
+
+    def add_version(self, version: FictionalCharacterVersion) -> int:
+        if id(version) in self.version_slots:
+            return self.version_slots[id(version)]
+
+        vector = self.stat_vector(version)
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.versions[slot] = version
+            self.vectors[slot] = vector
+        else:
+            slot = len(self.versions)
+            self.versions.append(version)
+            self.vectors.append(vector)
+        slot_bit = 1 << slot
+        self.version_slots[id(version)] = slot
+
+        for stat_index, tier_value in enumerate(vector):
+            stat_bitsets = self.value_bitsets[stat_index]
+            stat_bitsets[tier_value] = stat_bitsets.get(tier_value, 0) | slot_bit
+        self.vector_bitsets[vector] = self.vector_bitsets.get(vector, 0) | slot_bit
+        self.slots_bitset |= slot_bit
+        self._invalidate_caches()
+        return slot
+
+    def remove_version(self, version: FictionalCharacterVersion):
+        slot = self.version_slots.pop(id(version), None)
+        if slot is None:
+            return
+
+        slot_bit = 1 << slot
+        vector = self.vectors[slot]
+        for stat_index, tier_value in enumerate(vector):
+            stat_bitsets = self.value_bitsets[stat_index]
+            stat_bitsets[tier_value] &= ~slot_bit
+            if not stat_bitsets[tier_value]:
+                del stat_bitsets[tier_value]
+        self.vector_bitsets[vector] &= ~slot_bit
+        if not self.vector_bitsets[vector]:
+            del self.vector_bitsets[vector]
+        self.slots_bitset &= ~slot_bit
+
+        self.versions[slot] = None
+        self.vectors[slot] = None
+        self.free_slots.append(slot)
+        self._invalidate_caches()
+
+    def remove_character(self, character: FictionalCharacter):
+        for version in character.character_versions:
+            self.remove_version(version)
+
+    def update_version(self, version: FictionalCharacterVersion):
+        # Re-indexes a version whose tier values were changed in place.
+        self.remove_version(version)
+        self.add_version(version)
+
+    def _invalidate_caches(self):
+        self._at_least_cache = [None for _ in self.stat_names]
+        self._at_most_cache = [None for _ in self.stat_names]
+
+    def __len__(self):
+        return len(self.version_slots)
+
+    def contains(self, version: FictionalCharacterVersion) -> bool:
+        return id(version) in self.version_slots
+
+    def versions_of_bitset(self, bitset: int) -> List[FictionalCharacterVersion]:
+        return [self.versions[slot] for slot in iterate_bitset(bitset)]
+
+    def equal_vector_bitset(self, vector: Tuple[int, ...]) -> int:
+        return self.vector_bitsets.get(vector, 0)
+
+    def at_least(self, stat_index: int, tier_value: int) -> int:
+        # Bitset of the versions whose tier value in the given stat is greater than or equal to tier_value.
+        if self._at_least_cache[stat_index] is None:
+            # Tier values are kept in descending order, each with the union of the bitsets of all values above it.
+            values = sorted(self.value_bitsets[stat_index], reverse=True)
+            cumulative_bitsets = []
+            running_bitset = 0
+            for value in values:
+                running_bitset |= self.value_bitsets[stat_index][value]
+                cumulative_bitsets.append(running_bitset)
+            self._at_least_cache[stat_index] = ([-value for value in values], cumulative_bitsets)
+        negated_values, cumulative_bitsets = self._at_least_cache[stat_index]
+        position = bisect.bisect_right(negated_values, -tier_value) - 1
+        return cumulative_bitsets[position] if position >= 0 else 0
+
+    def values_of_stat(self, stat_index: int) -> List[int]:
+        # The distinct tier values of the stat in descending order.
+        self.at_least(stat_index, 0)
+        return [-value for value in self._at_least_cache[stat_index][0]]
+
+    def at_most(self, stat_index: int, tier_value: int) -> int:
+        # Bitset of the versions whose tier value in the given stat is less than or equal to tier_value.
+        if self._at_most_cache[stat_index] is None:
+            values = sorted(self.value_bitsets[stat_index])
+            cumulative_bitsets = []
+            running_bitset = 0
+            for value in values:
+                running_bitset |= self.value_bitsets[stat_index][value]
+                cumulative_bitsets.append(running_bitset)
+            self._at_most_cache[stat_index] = (values, cumulative_bitsets)
+        values, cumulative_bitsets = self._at_most_cache[stat_index]
+        position = bisect.bisect_right(values, tier_value) - 1
+        return cumulative_bitsets[position] if position >= 0 else 0
@@ -0,0 +1,143 @@
+import math
+
+import numpy as np
+
+from src.character import FictionalCharacterVersion
+from typing import Dict, List, Tuple
+
+
+class SimulatedBattleResult:
+    def __init__(self, v1: FictionalCharacterVersion, v2: FictionalCharacterVersion, trial_count: int,
+                 v1_win_count: int, v2_win_count: int, confidence_z: float):
+        self.character_version1 = v1
+        self.character_version2 = v2
+        self.trial_count = trial_count
+        self.v1_win_count = v1_win_count
+        self.v2_win_count = v2_win_count
+        self.tie_count = trial_count - v1_win_count - v2_win_count
+        self.v1_win_probability = v1_win_count / trial_count
+        self.v2_win_probability = v2_win_count / trial_count
+        self.tie_probability = self.tie_count / trial_count
+        self.v1_win_interval = wilson_interval(v1_win_count, trial_count, confidence_z)
+        self.v2_win_interval = wilson_interval(v2_win_count, trial_count, confidence_z)
+
+    def __str__(self):
+        result = "\n" + ("-" * 50) + "\n"
+        result += f"Simulated Versus Battle ({self.trial_count} bouts):\n"
+        result += f"{self.character_version1.character_name} {self.character_version1.version_name} vs. " \
+                  f"{self.character_version2.character_name} {self.character_version2.version_name}!\n"
+        result += ("-" * 50) + "\n"
+        result += f"{self.character_version1.character_name} wins: " \
+                  f"{self._probability_string(self.v1_win_probability, self.v1_win_interval)}\n"
+        result += f"{self.character_version2.character_name} wins: " \
+                  f"{self._probability_string(self.v2_win_probability, self.v2_win_interval)}\n"
+        result += f"Tie: {self.tie_probability:.1%}\n"
+        result += ("-" * 50) + "\n"
+        return result
+
+    @staticmethod
+    def _probability_string(probability: float, interval: Tuple[float, float]) -> str:
+        return f"{probability:.1%} (between {interval[0]:.1%} and {interval[1]:.1%})"
+
+
+def wilson_interval(success_count: int, trial_count: int, z: float) -> Tuple[float, float]:
+    # The Wilson score interval stays within [0, 1] and behaves well for probabilities close to 0 or 1, which are
+    # common for lopsided matchups.
+    if trial_count == 0:
+        return 0.0, 1.0
+    p = success_count / trial_count
+    denominator = 1 + z * z / trial_count
+    center = (p + z * z / (2 * trial_count)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trial_count + z * z / (4 * trial_count * trial_count)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+class BattleSimulator:
+    # The simulator treats every tier of a version as a lower bound, since wiki ratings are often given as
+    # "at least 7-B". In each simulated bout the tier value of a stat is raised by a random number of tiers between
+    # 0 and the uncertainty of that tier, the stats are compared like in versus_battle and the results are summed
+    # with the stat weights. Stats that lack a tier value for either version are left out, as in versus_battle.
+    #
+    # stat_weights : Dict[str, float], the weight of each stat; missing stats weigh 1
+    # tier_uncertainty : Dict[str, Dict[str, int]], maps a stat name and a tier name to the number of tiers the real
+    #                    value may lie above it; tiers that are not listed use default_uncertainty
+    def __init__(self, stat_names: List[str], stat_weights: Dict[str, float] = None,
+                 tier_uncertainty: Dict[str, Dict[str, int]] = None, default_uncertainty: int = 0,
+                 trial_count: int = 1000, confidence_z: float = 1.96, seed: int = None):
+        if trial_count < 1:
+            raise ValueError(f"The number of trials must be at least 1, got {trial_count}.")
+        self.stat_names = list(stat_names)
+        stat_weights = stat_weights or {}
+        self.stat_weights = np.array([stat_weights.get(stat_name, 1.0) for stat_name in self.stat_names])
+        # Scores are float sums of the weights, so a bout whose score is within rounding error of 0 is a tie.
+        self.tie_tolerance = 1e-9 * max(1.0, float(np.abs(self.stat_weights).sum()))
+        self.tier_uncertainty = tier_uncertainty or {}
+        self.default_uncertainty = default_uncertainty
+        self.trial_count = trial_count
+        self.confidence_z = confidence_z
+        self.rng = np.random.default_rng(seed)
+        # The draws of a batch hold (matchups x trials x stats) values, so batches are limited to about this many.
+        self.max_batch_draws = 2 ** 22
+
+    def _version_arrays(self, version: FictionalCharacterVersion) -> Tuple[List[int], List[int], List[bool]]:
+        tier_values, uncertainties, has_tier = [], [], []
+        for stat_name in self.stat_names:
+            tier = version.stat_tier_map.get(stat_name)
+            if tier is None:
+                tier_values.append(0)
+                uncertainties.append(0)
+                has_tier.append(False)
+            else:
+                tier_values.append(tier.tier_value)
+                uncertainties.append(self.tier_uncertainty.get(stat_name, {})
+                                     .get(tier.default_tier_name, self.default_uncertainty))
+                has_tier.append(True)
+        return tier_values, uncertainties, has_tier
+
+    def simulate(self, version1: FictionalCharacterVersion, version2: FictionalCharacterVersion) \
+            -> SimulatedBattleResult:
+        return self.simulate_bracket([(version1, version2)])[0]
+
+    def simulate_bracket(self, matchups: List[Tuple[FictionalCharacterVersion, FictionalCharacterVersion]]) \
+            -> List[SimulatedBattleResult]:
+        if len(matchups) == 0:
+            return []
+
+        # Each side of the bracket is packed into (matchups x stats) arrays once, and all the bouts of a batch of
+        # matchups are drawn and scored with array operations.
+        version_arrays = {}
+        for version in {id(version): version for matchup in matchups for version in matchup}.values():
+            version_arrays[id(version)] = self._version_arrays(version)
+        v1_arrays = [version_arrays[id(v1)] for v1, _ in matchups]
+        v2_arrays = [version_arrays[id(v2)] for _, v2 in matchups]
+
+        values1 = np.array([arrays[0] for arrays in v1_arrays], dtype=np.int16)
+        uncertainties1 = np.array([arrays[1] for arrays in v1_arrays], dtype=np.int16)
+        values2 = np.array([arrays[0] for arrays in v2_arrays], dtype=np.int16)
+        uncertainties2 = np.array([arrays[1] for arrays in v2_arrays], dtype=np.int16)
+        # weights : (matchups x stats), zero for the stats that cannot be compared in a matchup
+        weights = np.array([arrays[2] for arrays in v1_arrays]) & np.array([arrays[2] for arrays in v2_arrays])
+        weights = weights * self.stat_weights
+
+        v1_win_counts = np.empty(len(matchups), dtype=np.int64)
+        v2_win_counts = np.empty(len(matchups), dtype=np.int64)
+        batch_size = max(1, self.max_batch_draws // (self.trial_count * max(1, len(self.stat_names))))
+        for begin in range(0, len(matchups), batch_size):
+            end = min(begin + batch_size, len(matchups))
+            size = (end - begin, self.trial_count, len(self.stat_names))
+            draws1 = values1[begin:end, None, :] \
+                + self.rng.integers(0, uncertainties1[begin:end, None, :] + 1, size, dtype=np.int16)
+            draws2 = values2[begin:end, None, :] \
+                + self.rng.integers(0, uncertainties2[begin:end, None, :] + 1, size, dtype=np.int16)
+            # Same convention as versus_battle: a negative score means the first version won the bout.
+            scores = np.einsum('mts,ms->mt', np.sign(draws2 - draws1), weights[begin:end])
+            v1_win_counts[begin:end] = np.count_nonzero(scores < -self.tie_tolerance, axis=1)
+            v2_win_counts[begin:end] = np.count_nonzero(scores > self.tie_tolerance, axis=1)
+
+        return [SimulatedBattleResult(v1, v2, self.trial_count, int(v1_win_counts[i]), int(v2_win_counts[i]),
+                                      self.confidence_z) for i, (v1, v2) in enumerate(matchups)]
+
+    def simulate_round_robin(self, versions: List[FictionalCharacterVersion]) -> List[SimulatedBattleResult]:
+        # Every version against every other version, evaluated as one bracket.
+        matchups = [(versions[i], versions[j]) for i in range(len(versions)) for j in range(i + 1, len(versions))]
+        return self.simulate_bracket(matchups)
@@ -1,6 +1,6 @@
 import copy
 
-from typing import List
+from typing import List, Optional
 
 
 class Tier:
@@ -36,6 +36,8 @@ class TierClassifier:
         self.stat_names = []
         # self.stat_name_to_all_tiers: Dict[String, List[Tier]]
         self.stat_name_to_all_tiers = {}
+        # self.stat_name_to_synonym_map: Dict[String, Dict[String, Tier]]
+        self.stat_name_to_synonym_map = {}
 
         self._read_config()
 
@@ -54,6 +56,14 @@ class TierClassifier:
                     tier.stat_name = stat_name
                 self.stat_name_to_all_tiers[stat_name] = default_stat_tiers_copy
 
+        # Every synonym of every tier is indexed, so that names can be resolved without scanning the tier lists.
+        for stat_name, all_tiers in self.stat_name_to_all_tiers.items():
+            synonym_map = {}
+            for tier in all_tiers:
+                for synonym in tier.synonyms:
+                    synonym_map.setdefault(synonym, tier)
+            self.stat_name_to_synonym_map[stat_name] = synonym_map
+
     def _read_all_tiers_of_stat(self, stat_name: str) -> List[Tier]:
         # stat_tiers : List[str] OR List[List[str]]
         stat_tiers = self.config[stat_name]["tiers"]
@@ -72,11 +82,22 @@ class TierClassifier:
         return tiers_list
 
     def is_valid_tier(self, stat_name: str, tier_name: str) -> bool:
-        return tier_name in self.stat_name_to_all_tiers[stat_name]
+        return tier_name in self.stat_name_to_synonym_map[stat_name]
 
     def get_tier_from_name(self, stat_name: str, tier_name: str) -> Tier:
-        index = self.stat_name_to_all_tiers[stat_name].index(tier_name)
-        return self.stat_name_to_all_tiers[stat_name][index]
+        tier = self.stat_name_to_synonym_map[stat_name].get(tier_name)
+        if tier is None:
+            raise ValueError(f"'{tier_name}' is not a tier of the stat '{stat_name}'.")
+        return tier
+
+    def get_tier_from_synonyms(self, stat_name: str, synonyms: List[str]) -> Optional[Tier]:
+        # Returns the first tier that is known by any of the given synonyms, or None if the stat or all the synonyms
+        # are unknown to this classifier.
+        synonym_map = self.stat_name_to_synonym_map.get(stat_name, {})
+        for synonym in synonyms:
+            if synonym in synonym_map:
+                return synonym_map[synonym]
+        return None
 
     def get_all_stat_names(self) -> [str]:
         return self.stat_names
@@ -0,0 +1,62 @@
+from src.character import FictionalCharacter
+from src.tier import Tier, TierClassifier
+from typing import Dict, Iterable, List, Optional
+
+
+class UnresolvedTier:
+    def __init__(self, character_name: str, version_name: str, stat_name: str, tier_name: str):
+        self.character_name = character_name
+        self.version_name = version_name
+        self.stat_name = stat_name
+        self.tier_name = tier_name
+
+    def __str__(self):
+        return f"Character: {self.character_name}, Version: {self.version_name}, " \
+               f"Stat: {self.stat_name}, Tier: {self.tier_name}"
+
+
+class TierRemapResult:
+    def __init__(self, remapped_count: int, unresolved_tiers: List[UnresolvedTier]):
+        self.remapped_count = remapped_count
+        self.unresolved_tiers = unresolved_tiers
+
+    def __str__(self):
+        result = f"{self.remapped_count} tier value(s) were remapped to the new tier configuration.\n"
+        if len(self.unresolved_tiers) == 0:
+            result += "All the tier values could be resolved!\n"
+        else:
+            result += f"{len(self.unresolved_tiers)} tier value(s) could not be resolved:\n"
+            result += "\n".join([f"\t-{str(unresolved)}" for unresolved in self.unresolved_tiers]) + "\n"
+        return result
+
+
+def remap_character_tiers(characters: Iterable[FictionalCharacter], tier_classifier: TierClassifier) \
+        -> TierRemapResult:
+    # The tier values of a stat are derived from the position of the tier in the tier configuration. When the
+    # configuration changes, the tiers of the parsed characters are resolved again by their synonyms instead of
+    # re-parsing the characters from their webpages.
+    # Tier objects are shared between character versions, so each distinct tier is only resolved once.
+    # resolved_tiers : Dict[int, Optional[Tier]]
+    resolved_tiers: Dict[int, Optional[Tier]] = {}
+    remapped_count = 0
+    unresolved_tiers = []
+
+    for character in characters:
+        for version in character.character_versions:
+            for stat_name, old_tier in list(version.stat_tier_map.items()):
+                if old_tier is None:
+                    continue
+                if id(old_tier) not in resolved_tiers:
+                    resolved_tiers[id(old_tier)] = tier_classifier.get_tier_from_synonyms(stat_name,
+                                                                                         old_tier.synonyms)
+                new_tier = resolved_tiers[id(old_tier)]
+                if new_tier is None:
+                    unresolved_tiers.append(UnresolvedTier(character.character_name, version.version_name,
+                                                           stat_name, old_tier.default_tier_name))
+                    # The stat is dropped, like a stat that could not be parsed, which the battle functions skip.
+                    version.remove_stat(stat_name)
+                else:
+                    remapped_count += 1
+                    version.stat_tier_map[stat_name] = new_tier
+
+    return TierRemapResult(remapped_count, unresolved_tiers)
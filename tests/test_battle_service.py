@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+import pytest
+
+from src import DEFAULT_TIER_CONFIG_PATH
+from src.battle_service import BattleServer, BattleService
+from src.character import FictionalCharacter, FictionalCharacterVersion
+from src.tier import TierClassifier
+
+
+@pytest.fixture
+def tier_classifier():
+    with open(DEFAULT_TIER_CONFIG_PATH, 'r') as config_file:
+        return TierClassifier(json.load(config_file))
+
+
+def make_character(tier_classifier, character_name, stat_tier_names):
+    stat_tier_map = {stat_name: tier_classifier.get_tier_from_name(stat_name, tier_name)
+                     for stat_name, tier_name in stat_tier_names.items()}
+    return FictionalCharacter(character_name, [FictionalCharacterVersion(character_name, "Base", stat_tier_map)])
+
+
+async def request(port, method, target, body=b"", headers=None):
+    # Sends a single request on a new connection and returns the status and the decoded JSON response.
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    headers = {"Content-Length": str(len(body)), "Connection": "close", **(headers or {})}
+    head = f"{method} {target} HTTP/1.1\r\nHost: localhost\r\n" \
+           + "".join(f"{name}: {value}\r\n" for name, value in headers.items()) + "\r\n"
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, response_body = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ")[1]), json.loads(response_body)
+
+
+def run_with_server(service, client):
+    async def run():
+        server = BattleServer(service, port=0)
+        await server.start()
+        try:
+            await client(server.port)
+        finally:
+            await server.close()
+    asyncio.run(run())
+
+
+@pytest.fixture
+def service(tier_classifier):
+    service = BattleService(tier_classifier)
+    service.set_character(make_character(tier_classifier, "Goku", {"Speed": "Massively FTL", "Durability": "5-B"}))
+    service.set_character(make_character(tier_classifier, "Vegeta", {"Speed": "Hypersonic+", "Durability": "7-B"}))
+    return service
+
+
+def test_battle_endpoints(service):
+    async def client(port):
+        status, response = await request(port, "GET", "/battle?character1=Goku&version1=Base"
+                                                      "&character2=Vegeta&version2=Base")
+        assert status == 200
+        assert response["winner"] == {"character": "Goku", "version": "Base"}
+        assert response["battleResults"] == {"Speed": -1, "Durability": -1}
+
+        matchups = {"matchups": [{"character1": "Vegeta", "version1": "Base", "character2": "Goku", "version2": "Base"},
+                                 {"character1": "Vegeta", "version1": "Base", "character2": "Frieza"}]}
+        status, response = await request(port, "POST", "/battles", json.dumps(matchups).encode("utf-8"))
+        assert status == 200
+        assert response[0]["winner"] == {"character": "Goku", "version": "Base"}
+        assert "error" in response[1]
+
+        assert (await request(port, "POST", "/battles", b"[]"))[0] == 400
+        assert (await request(port, "POST", "/battles", b"{not json"))[0] == 400
+
+    run_with_server(service, client)
+
+
+def test_error_statuses(service):
+    async def client(port):
+        assert (await request(port, "GET", "/characters/Frieza"))[0] == 404
+        assert (await request(port, "GET", "/battle?character1=Goku&version1=SSJ"
+                                           "&character2=Vegeta&version2=Base"))[0] == 404
+        assert (await request(port, "GET", "/nothing-here"))[0] == 404
+        assert (await request(port, "DELETE", "/characters"))[0] == 405
+        assert (await request(port, "GET", "/battles"))[0] == 405
+        assert (await request(port, "GET", "/characters", headers={"Content-Length": "abc"}))[0] == 400
+
+    run_with_server(service, client)
+
+
+def test_set_character_invalidates_cached_scores(service, tier_classifier):
+    async def client(port):
+        target = "/battle?character1=Goku&version1=Base&character2=Vegeta&version2=Base"
+        assert (await request(port, "GET", target))[1]["winner"]["character"] == "Goku"
+        assert len(service.score_cache) == 1
+
+        # The server and the test share the event loop, so the roster is changed between two requests.
+        service.set_character(make_character(tier_classifier, "Vegeta", {"Speed": "Massively FTL",
+                                                                          "Durability": "3-A"}))
+        assert len(service.score_cache) == 0
+        status, response = await request(port, "GET", target)
+        assert status == 200
+        assert response["battleResults"] == {"Speed": 0, "Durability": 1}
+        assert response["winner"] == {"character": "Vegeta", "version": "Base"}
+
+    run_with_server(service, client)
+
+
+def test_leaderboard_skips_missing_stats(service, tier_classifier):
+    # Frieza has no Durability, so neither Frieza nor the others win a Durability comparison against each other.
+    service.set_character(make_character(tier_classifier, "Frieza", {"Speed": "Hypersonic+"}))
+    stat_wins = {entry["character"]: entry["statWins"] for entry in service.leaderboard(10)}
+    assert stat_wins == {"Goku": 3, "Vegeta": 0, "Frieza": 0}
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from src import DEFAULT_TIER_CONFIG_PATH
+from src.character import FictionalCharacter, FictionalCharacterVersion
+from src.character_io import read_characters_binary, write_characters_binary
+from src.tier import TierClassifier
+
+
+@pytest.fixture
+def tier_classifier():
+    with open(DEFAULT_TIER_CONFIG_PATH, 'r') as config_file:
+        return TierClassifier(json.load(config_file))
+
+
+def make_version(tier_classifier, character_name, version_name, stat_tier_names):
+    stat_tier_map = {stat_name: tier_classifier.get_tier_from_name(stat_name, tier_name)
+                     for stat_name, tier_name in stat_tier_names.items()}
+    return FictionalCharacterVersion(character_name, version_name, stat_tier_map)
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_binary_round_trip_keeps_character_records(tier_classifier, tmp_path, compress):
+    # The two characters named Goku have identical versions, and the stats missing from a version must stay missing.
+    characters = [
+        FictionalCharacter("Goku", [make_version(tier_classifier, "Goku", "Base", {"Speed": "Hypersonic+"})]),
+        FictionalCharacter("Empty", []),
+        FictionalCharacter("Goku", [make_version(tier_classifier, "Goku", "Base", {"Speed": "Hypersonic+"}),
+                                    make_version(tier_classifier, "Goku", "SSJ", {"Attack Potency": "5-B"})])
+    ]
+    output_file_path = str(tmp_path / "characters.fcvs")
+    write_characters_binary(characters, output_file_path, compress)
+
+    read_characters = read_characters_binary(output_file_path, tier_classifier)
+
+    assert [character.character_name for character in read_characters] == ["Goku", "Empty", "Goku"]
+    for character, read_character in zip(characters, read_characters):
+        assert [version.version_aliases for version in read_character.character_versions] == \
+               [version.version_aliases for version in character.character_versions]
+        assert [version.stat_vector_key() for version in read_character.character_versions] == \
+               [version.stat_vector_key() for version in character.character_versions]
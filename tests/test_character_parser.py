@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from src import DEFAULT_TIER_CONFIG_PATH
+from src import character_parser
+from src.character_config_store import CharacterConfigStore
+from src.character_parser import CharacterParser
+from src.tier import TierClassifier
+from src.tier_parser import TierParser
+
+PAGE_URL = "https://example.com/wiki/Goku"
+
+STAT_TIERS = {
+    "Attack Potency": ["7-B", "5-B", "3-A"],
+    "Speed": ["Hypersonic+", "Relativistic+", "Massively FTL"],
+    "Lifting Strength": ["Class 100", "Class T", "Galactic"],
+    "Striking Strength": ["7-B", "5-B", "3-A"],
+    "Durability": ["8-A", "6-C", "4-A"],
+    "Stamina": ["Below Average", "Superhuman", "Superhuman"],
+    "Range": ["Tens of Meters", "Interplanetary", "Universal"],
+    "Intelligence": ["Below Average", "Genius", "Genius"]
+}
+
+
+def build_page() -> str:
+    # Long filler makes the stat paragraphs span many chunks, and the text before "Key:" moves it off chunk starts.
+    filler = "Some lore that is not parsed. " * 40
+    stat_paragraphs = []
+    for stat_name, tier_names in STAT_TIERS.items():
+        href = "/wiki/" + stat_name.replace(" ", "_")
+        tiers = " | ".join(f"<b>{tier_name}</b>, {filler}" for tier_name in tier_names)
+        stat_paragraphs.append(f'<p><b><a href="{href}" title="{stat_name}">{stat_name}</a>:</b> {tiers}</p>\n')
+    return (
+        "<html><head><title>Goku</title></head><body><div class=\"content\">\n"
+        f"<p>{filler}</p>\n"
+        "<p><b>Key:</b> Base | Super Saiyan | Ultra Instinct</p>\n"
+        + "".join(stat_paragraphs) +
+        f"<p>{filler}</p>\n"
+        "</div></body></html>\n"
+    )
+
+
+class FakeResponse:
+    def __init__(self, text: str, chunk_sizes: list):
+        self.text = text
+        self.encoding = 'utf-8'
+        self.chunk_sizes = chunk_sizes
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        self.chunk_sizes.append(chunk_size)
+        for begin in range(0, len(self.text), chunk_size):
+            yield self.text[begin:begin + chunk_size]
+
+
+@pytest.fixture
+def tier_parser():
+    with open(DEFAULT_TIER_CONFIG_PATH, 'r') as config_file:
+        return TierParser(TierClassifier(json.load(config_file)))
+
+
+@pytest.fixture
+def fake_requests(monkeypatch):
+    chunk_sizes = []
+    page = build_page()
+    monkeypatch.setattr(character_parser.requests, "get", lambda url, **kwargs: FakeResponse(page, chunk_sizes))
+    return chunk_sizes
+
+
+def stat_tier_names(character):
+    return [(version.version_name, {stat_name: tier.default_tier_name if tier else None
+                                    for stat_name, tier in version.stat_tier_map.items()})
+            for version in character.character_versions]
+
+
+@pytest.mark.parametrize("chunk_size", [16 * 1024, 4096, 1000, 333, 20, 7, 1])
+def test_streaming_parse_matches_full_parse(tier_parser, fake_requests, chunk_size):
+    config_store = CharacterConfigStore(None, {"characters": [{"name": "Goku", "url": PAGE_URL}]})
+    expected = CharacterParser(tier_parser, config_store).parse_character("Goku")
+
+    streaming_parser = CharacterParser(tier_parser, config_store, streaming=True)
+    streaming_parser.stream_chunk_size = chunk_size
+    character = streaming_parser.parse_character("Goku")
+
+    assert chunk_size in fake_requests
+    assert len(expected.character_versions) == 3
+    assert all(len(version.stat_tier_map) == len(STAT_TIERS) for version in expected.character_versions)
+    assert stat_tier_names(character) == stat_tier_names(expected)
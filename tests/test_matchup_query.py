@@ -0,0 +1,59 @@
+import json
+import random
+
+import pytest
+
+from src import DEFAULT_TIER_CONFIG_PATH
+from src.battle import versus_battle
+from src.character import FictionalCharacter, FictionalCharacterVersion
+from src.matchup_query import top_versions_of_stat, versions_beating
+from src.roster_index import RosterIndex
+from src.tier import TierClassifier
+
+
+@pytest.fixture
+def tier_classifier():
+    with open(DEFAULT_TIER_CONFIG_PATH, 'r') as config_file:
+        return TierClassifier(json.load(config_file))
+
+
+def random_roster(tier_classifier, version_count, missing_rate, seed):
+    # One character per version, with about missing_rate of the stats left without a tier.
+    rng = random.Random(seed)
+    characters = []
+    for i in range(version_count):
+        stat_tier_map = {}
+        for stat_name in tier_classifier.get_all_stat_names():
+            if rng.random() >= missing_rate:
+                stat_tier_map[stat_name] = rng.choice(tier_classifier.get_all_tiers_of_stat(stat_name)[:6])
+        characters.append(FictionalCharacter(f"Character {i}", [
+            FictionalCharacterVersion(f"Character {i}", "Base", stat_tier_map)]))
+    return characters
+
+
+@pytest.mark.parametrize("missing_rate", [0.0, 0.2, 0.5])
+def test_versions_beating_matches_versus_battle(tier_classifier, missing_rate):
+    characters = random_roster(tier_classifier, 180, missing_rate, seed=7)
+    roster_index = RosterIndex.from_characters(tier_classifier.get_all_stat_names(), characters)
+    versions = [character.character_versions[0] for character in characters]
+
+    for version in versions[:20]:
+        # A positive result means the second version won the stat.
+        stat_wins = {id(other): list(versus_battle(version, other).battle_results.values()).count(1)
+                     for other in versions}
+        for min_stat_wins in range(1, 5):
+            expected = [other for other in versions if stat_wins[id(other)] >= min_stat_wins]
+            assert versions_beating(roster_index, version, min_stat_wins) == expected
+
+
+def test_top_versions_of_stat_skips_versions_without_the_stat(tier_classifier):
+    characters = random_roster(tier_classifier, 50, 0.5, seed=3)
+    roster_index = RosterIndex.from_characters(tier_classifier.get_all_stat_names(), characters)
+    with_speed = [character.character_versions[0] for character in characters
+                  if "Speed" in character.character_versions[0].stat_tier_map]
+
+    top_versions = top_versions_of_stat(roster_index, "Speed", len(characters))
+
+    assert len(top_versions) == len(with_speed)
+    assert [version.stat_tier_map["Speed"].tier_value for version in top_versions] == \
+           sorted((version.stat_tier_map["Speed"].tier_value for version in with_speed), reverse=True)
@@ -0,0 +1,75 @@
+import multiprocessing
+import sqlite3
+import time
+
+import pytest
+
+from src.character import FictionalCharacter, FictionalCharacterVersion
+from src.parse_queue import JOB_DONE, JOB_FAILED, ParseJobQueue, ParseWorker
+
+FAILING_URL = "https://example.com/wiki/Unparsable"
+
+
+class FakeParser:
+    # Parses without network access. Characters at FAILING_URL come back without versions, like failed parses.
+    def parse_character_from_url(self, character_name, url):
+        if url == FAILING_URL:
+            return FictionalCharacter.from_character_name(character_name)
+        return FictionalCharacter(character_name, [FictionalCharacterVersion(character_name, "Base", {})])
+
+
+def run_fake_worker(db_fpath, shared_filesystem):
+    job_queue = ParseJobQueue(db_fpath, lease_seconds=30.0, shared_filesystem=shared_filesystem)
+    try:
+        return ParseWorker(job_queue, FakeParser(), claim_count=5).run(poll_interval=0.05)
+    finally:
+        job_queue.close()
+
+
+def job_attempts(db_fpath):
+    with sqlite3.connect(db_fpath) as connection:
+        return connection.execute("SELECT character_name, status, attempts FROM parse_jobs").fetchall()
+
+
+@pytest.mark.parametrize("shared_filesystem", [False, True])
+def test_worker_processes_share_the_queue(tmp_path, shared_filesystem):
+    db_fpath = str(tmp_path / "queue.db")
+    job_queue = ParseJobQueue(db_fpath, max_attempts=3, shared_filesystem=shared_filesystem)
+    jobs = [(f"Character {i}", FAILING_URL if i % 50 == 0 else f"https://example.com/wiki/{i}") for i in range(500)]
+    job_queue.enqueue(jobs)
+    failing_count = sum(1 for _, url in jobs if url == FAILING_URL)
+
+    process_count = 4
+    with multiprocessing.Pool(process_count) as pool:
+        completed_counts = pool.starmap(run_fake_worker, [(db_fpath, shared_filesystem)] * process_count)
+
+    assert sum(completed_counts) == len(jobs) - failing_count
+    assert job_queue.get_status_counts() == {JOB_DONE: len(jobs) - failing_count, JOB_FAILED: failing_count}
+    assert sorted(name for name, _ in job_queue.get_results()) == \
+           sorted(name for name, url in jobs if url != FAILING_URL)
+    # The leases never expired, so every job was claimed once, except the failing ones, which were retried.
+    for _, status, attempts in job_attempts(db_fpath):
+        assert attempts == (3 if status == JOB_FAILED else 1)
+    job_queue.close()
+
+
+def test_expired_leases_are_claimed_again(tmp_path):
+    db_fpath = str(tmp_path / "queue.db")
+    job_queue = ParseJobQueue(db_fpath, lease_seconds=0.2, max_attempts=2)
+    job_queue.enqueue([("Goku", "https://example.com/wiki/Goku")])
+
+    (job,) = job_queue.claim("worker-1")
+    assert job_queue.claim("worker-2") == []
+    time.sleep(0.3)
+    (reclaimed_job,) = job_queue.claim("worker-2")
+    assert reclaimed_job.job_id == job.job_id and reclaimed_job.attempts == 2
+
+    # The first worker lost its lease, so it can neither renew it nor store its result.
+    assert not job_queue.heartbeat(job.job_id, "worker-1")
+    assert not job_queue.complete(job.job_id, "worker-1", "{}")
+
+    # The second lease expires too, and the job has no attempts left.
+    time.sleep(0.3)
+    assert job_queue.claim("worker-3") == []
+    assert job_queue.get_status_counts() == {JOB_FAILED: 1}
+    job_queue.close()